@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Batch edit benchmark: set, update and remove N variables in one command
+
+Runs batches of 10, 1,000 and 10,000 names in a scratch HOME whose
+~/.zshrc holds the batch's exports among unrelated filler lines:
+
+  add     set N new names (appended to the generated env file)
+  update  set N names ~/.zshrc already exports (one in-place rewrite)
+  remove  remove those N names again (one in-place rewrite)
+
+For comparison the "naive scan" column times only the per-name prefix
+scan (every line checked against every "export NAME=" prefix) that a
+rewrite would cost without the single-pass name lookup. Unlike the other
+columns it includes no backup, journal or write, so it is a lower bound
+for the naive approach; it is skipped where it would take too long.
+
+Each size runs in its own scratch HOME, removed afterwards.
+
+Usage: python3 benchmarks/bench_batch.py [--filler LINES] [--sizes N ...]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+NAIVE_LIMIT = 200_000_000  # line x name comparisons
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        ok = func(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    if ok is False:
+        raise SystemExit(f"{func.__name__} failed")
+    return elapsed
+
+
+def naive_scan(lines, names) -> float:
+    """Per-name prefix matching over every line, as the old rewrite did"""
+    prefixes = [f"export {name}=" for name in names]
+    start = time.perf_counter()
+    hits = 0
+    for line in lines:
+        stripped = line.strip()
+        for prefix in prefixes:
+            if stripped.startswith(prefix):
+                hits += 1
+                break
+    return (time.perf_counter() - start) * 1000
+
+
+def run(size: int, filler: int) -> str:
+    with tempfile.TemporaryDirectory(prefix='configkeys-bench-') as home:
+        os.environ['HOME'] = home
+        return run_in(home, size, filler)
+
+
+def run_in(home: str, size: int, filler: int) -> str:
+    for var in ('XDG_CONFIG_HOME', 'XDG_DATA_HOME', 'XDG_CACHE_HOME'):
+        os.environ.pop(var, None)
+    names = [f"BENCH_VAR_{i}" for i in range(size)]
+    rc_file = os.path.join(home, '.zshrc')
+    with open(rc_file, 'w') as f:
+        for i in range(filler):
+            f.write(f"alias a{i}='echo {i}'\n" if i % 2 else f"export FILLER_{i}={i}\n")
+        f.writelines(f"export {name}=one\n" for name in names)
+    with open(rc_file) as f:
+        lines = f.readlines()
+
+    import configkeys_core
+
+    manager = configkeys_core.MacEnvManager()
+    t_add = timed(manager.set_env_vars, {f"NEW_{name}": 'one' for name in names})
+    t_update = timed(manager.set_env_vars, {name: 'two' for name in names})
+    t_remove = timed(manager.remove_env_vars, names)
+
+    if len(lines) * size <= NAIVE_LIMIT:
+        naive = f"{naive_scan(lines, names):>12.1f}"
+    else:
+        naive = f"{'skipped':>12}"
+    return f"{size:>7}{t_add:>10.1f}{t_update:>10.1f}{t_remove:>10.1f}{naive}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filler', type=int, default=5000,
+                        help='Unrelated lines in ~/.zshrc (default: 5000)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000],
+                        help='Batch sizes to run (default: 10 1000 10000)')
+    args = parser.parse_args()
+
+    os.environ['CONFIGKEYS_ZCOMPILE'] = '0'
+    run(1, 10)  # Warm up: the first commit in a process pays for lazy imports
+    print(f"Batch edits with {args.filler} filler lines in ~/.zshrc, times in ms")
+    print("-" * 49)
+    print(f"{'names':>7}{'add':>10}{'update':>10}{'remove':>10}{'naive scan':>12}")
+    for size in args.sizes:
+        print(run(size, args.filler))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/bin/bash
+
+# Time launches of an install against a bare python3. configkeys is
+# installed into a temporary prefix and run through its shebang, the way
+# a shell would run it.
+#
+# Usage: benchmarks/startup.sh [RUNS]
+
+set -e
+
+RUNS="${1:-30}"
+REPO_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+WORK_DIR="$(mktemp -d)"
+trap 'rm -rf "$WORK_DIR"' EXIT
+
+"$REPO_DIR/install.sh" --prefix "$WORK_DIR/bin" >/dev/null
+
+HOME="$WORK_DIR/home" CONFIGKEYS_NO_DAEMON=1 python3 - "$RUNS" "$WORK_DIR" <<'PYTHON'
+import os
+import subprocess
+import sys
+import time
+
+runs = int(sys.argv[1])
+work_dir = sys.argv[2]
+os.makedirs(os.environ['HOME'], exist_ok=True)
+commands = [['export', 'NAME', 'value'], ['list', 'PATH'], ['info']]
+
+
+def best_of(cmd):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2]
+
+
+print(f"Launch time in ms (best / median of {runs} runs)")
+print("-" * 50)
+bare = best_of([sys.executable, '-c', 'pass'])
+print(f"{'python3 -c pass':<22}{bare[0]:>8.1f} /{bare[1]:>6.1f}")
+for args in commands:
+    timing = best_of([os.path.join(work_dir, 'bin', 'configkeys')] + args)
+    print(f"{' '.join(args):<22}{timing[0]:>8.1f} /{timing[1]:>6.1f}"
+          f"   (+{timing[1] - bare[1]:.1f} median)")
+PYTHON
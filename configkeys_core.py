@@ -0,0 +1,2855 @@
+"""
+ConfigureMacKeys - A simple CLI tool for managing environment variables on macOS
+
+Implementation module; configkeys.py is the entry point.
+"""
+
+# Startup time matters here: `eval $(configkeys export ...)` runs during
+# shell init. This module is imported rather than run as a script so its
+# bytecode is cached. Only os and sys (both preloaded by the interpreter)
+# are imported at module level; everything else is imported where it is
+# used, so each subcommand pays only for what it needs.
+from __future__ import annotations
+
+import os
+import sys
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import argparse
+    from pathlib import Path
+    from typing import Callable, Dict, Iterable, List, Pattern, Tuple, Optional
+
+
+MARKER_COMMENT = "# Added by ConfigureMacKeys"
+
+COPY_CHUNK_SIZE = 1024 * 1024
+OUTPUT_CHUNK_SIZE = 64 * 1024
+DEFAULT_BACKUP_KEEP = 50
+
+# Line kinds produced by the shell config tokenizer
+LINE_EXPORT = 'export'
+LINE_MARKER = 'marker'
+LINE_SOURCE = 'source'
+LINE_COMMENT = 'comment'
+LINE_OTHER = 'other'
+
+NAME_PATTERN = r'[A-Za-z_][A-Za-z0-9_]*'
+EXPORT_PATTERN = rf'^\s*export\s+({NAME_PATTERN})=(.*)$'
+# Values a shell exports verbatim, with no quoting or expansion to apply
+LITERAL_VALUE_PATTERN = r'^[A-Za-z0-9_./:,=@%+-]*$'
+SOURCE_PATTERN = r'^(?:source|\.)\s+("[^"]*"|\'[^\']*\'|[^\s;&|]+)'
+
+# First line of the generated env file; contains the marker so appends
+# to it never add another marker header
+ENV_FILE_HEADER = f"{MARKER_COMMENT}: generated file, change it with `configkeys set/remove`\n"
+
+_compiled_patterns: Dict[str, Pattern] = {}
+
+
+def compiled(pattern: str) -> Pattern:
+    """Compile a module-level regex on first use"""
+    regex = _compiled_patterns.get(pattern)
+    if regex is None:
+        import re
+        regex = _compiled_patterns[pattern] = re.compile(pattern)
+    return regex
+
+
+class ConfigLine:
+    """A single tokenized line of a shell configuration file"""
+
+    __slots__ = ('kind', 'text', 'name', 'value')
+
+    def __init__(self, kind: str, text: str, name: Optional[str] = None,
+                 value: Optional[str] = None):
+        self.kind = kind
+        self.text = text
+        self.name = name
+        self.value = value
+
+
+def tokenize_line(text: str) -> ConfigLine:
+    """Classify one raw line as an export, source, marker, comment or other line"""
+    stripped = text.strip()
+    match = compiled(EXPORT_PATTERN).match(stripped)
+    if match:
+        return ConfigLine(LINE_EXPORT, text, match.group(1), match.group(2))
+    match = compiled(SOURCE_PATTERN).match(stripped)
+    if match:
+        return ConfigLine(LINE_SOURCE, text, value=match.group(1).strip('"\''))
+    if MARKER_COMMENT in text:
+        return ConfigLine(LINE_MARKER, text)
+    if stripped.startswith('#'):
+        return ConfigLine(LINE_COMMENT, text)
+    return ConfigLine(LINE_OTHER, text)
+
+
+def parse_assignment(text: str) -> Optional[Tuple[str, str]]:
+    """Parse a NAME=VALUE (optionally export-prefixed) line
+
+    Returns None for blank lines and comments; raises ValueError for
+    anything else that is not a valid assignment.
+    """
+    stripped = text.strip()
+    if not stripped or stripped.startswith('#'):
+        return None
+    if stripped.startswith('export '):
+        stripped = stripped[len('export '):].lstrip()
+    name, sep, value = stripped.partition('=')
+    if not sep or not compiled(NAME_PATTERN).fullmatch(name):
+        raise ValueError(f"Invalid assignment '{text.strip()}' (expected NAME=VALUE)")
+    return name, value
+
+
+class NameMatcher:
+    """Glob and regex patterns over variable names, compiled once
+
+    All globs are folded into one anchored regex and all regexes into a
+    second one, so matching a name costs at most two regex calls no
+    matter how many patterns were given. Globs match the whole name;
+    regexes match anywhere in it, like grep.
+    """
+
+    def __init__(self, globs: Iterable[str] = (), regexes: Iterable[str] = ()):
+        import re
+        import fnmatch
+
+        self.globs = globs = list(globs)
+        self.regexes = regexes = list(regexes)
+        for pattern in regexes:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                # Name the offending pattern; callers need not import re
+                raise ValueError(f"'{pattern}': {e}") from None
+        self.glob_re = (re.compile('|'.join(fnmatch.translate(g) for g in globs))
+                        if globs else None)
+        self.regex_re = (re.compile('|'.join(f'(?:{r})' for r in regexes))
+                         if regexes else None)
+
+    def __bool__(self) -> bool:
+        return self.glob_re is not None or self.regex_re is not None
+
+    def matches(self, name: str) -> bool:
+        if self.glob_re is not None and self.glob_re.match(name):
+            return True
+        return self.regex_re is not None and self.regex_re.search(name) is not None
+
+
+class ListFilter:
+    """Precompiled predicate for `list`
+
+    A name is selected when it contains any of the substrings (case
+    insensitive) or matches any glob or regex; with no name patterns,
+    every name is a candidate. value_contains then requires the value to
+    contain one of the given strings, and exclude drops names matching
+    any of its globs. Each pattern group is folded into one regex up
+    front, so selecting from an environment is a single pass.
+    """
+
+    def __init__(self, substrings: Iterable[str] = (), globs: Iterable[str] = (),
+                 regexes: Iterable[str] = (), value_contains: Iterable[str] = (),
+                 exclude: Iterable[str] = ()):
+        import re
+
+        self.substrings = substrings = list(substrings)
+        value_contains = list(value_contains)
+        self.substring_re = (re.compile('|'.join(re.escape(s.lower()) for s in substrings))
+                             if substrings else None)
+        self.names = NameMatcher(globs, regexes)
+        self.value_re = (re.compile('|'.join(re.escape(v) for v in value_contains))
+                         if value_contains else None)
+        self.exclude = NameMatcher(exclude)
+        self.simple = not (self.names or self.value_re is not None or self.exclude)
+
+    def __bool__(self) -> bool:
+        return bool(self.substrings) or not self.simple
+
+    def describe(self) -> str:
+        if self.simple and len(self.substrings) == 1:
+            return f"'{self.substrings[0]}'"
+        return "the given filters"
+
+    def select(self, environ) -> List[str]:
+        """Return the names in environ that pass the filter"""
+        if not self:
+            return list(environ)
+        substring = self.substring_re.search if self.substring_re is not None else None
+        names = self.names.matches if self.names else None
+        value = self.value_re.search if self.value_re is not None else None
+        exclude = self.exclude.matches if self.exclude else None
+        any_name = substring is None and names is None
+
+        # Lowercase key index, built once for this environment snapshot
+        lowered = [(key.lower(), key) for key in environ] if substring else None
+        candidates = lowered if lowered is not None else ((key, key) for key in environ)
+
+        selected = []
+        for folded, key in candidates:
+            if not (any_name
+                    or (substring is not None and substring(folded))
+                    or (names is not None and names(key))):
+                continue
+            if value is not None and not value(environ[key]):
+                continue
+            if exclude is not None and exclude(key):
+                continue
+            selected.append(key)
+        return selected
+
+
+class ConfigIndex:
+    """Export index of a shell config, detached from its line records
+
+    This is what the parse cache stores, so existence checks and value
+    lookups can be answered without reading the config file at all.
+    """
+
+    def __init__(self, exports: Dict[str, List[Tuple[int, str]]],
+                 has_marker: bool, line_count: int,
+                 sources: Optional[List[Tuple[int, str]]] = None):
+        self.exports = exports
+        self.has_marker = has_marker
+        self.line_count = line_count
+        self.sources = sources if sources is not None else []
+
+    @classmethod
+    def scan(cls, lines: Iterable[str]) -> 'ConfigIndex':
+        """Build an index from a stream of raw lines without keeping them"""
+        index = cls({}, False, 0)
+        for text in lines:
+            index.add_line(tokenize_line(text))
+        return index
+
+    def add_line(self, line: ConfigLine) -> None:
+        """Record the next line of the file in the index"""
+        if line.kind == LINE_EXPORT:
+            self.exports.setdefault(line.name, []).append((self.line_count, line.value))
+        elif line.kind == LINE_SOURCE:
+            self.sources.append((self.line_count, line.value))
+        elif line.kind == LINE_MARKER:
+            self.has_marker = True
+        self.line_count += 1
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.exports
+
+    def get(self, name: str) -> Optional[str]:
+        """Return the value of the last export of name, if any"""
+        entries = self.exports.get(name)
+        return entries[-1][1] if entries else None
+
+    def to_dict(self) -> dict:
+        return {
+            'exports': self.exports,
+            'has_marker': self.has_marker,
+            'line_count': self.line_count,
+            'sources': self.sources,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ConfigIndex':
+        exports = {name: [(lineno, value) for lineno, value in entries]
+                   for name, entries in data['exports'].items()}
+        sources = [(lineno, path) for lineno, path in data['sources']]
+        return cls(exports, data['has_marker'], data['line_count'], sources)
+
+
+def find_exports(config_file: Path, name: str,
+                 with_lines: bool = False) -> List[Tuple[Optional[int], str]]:
+    """Find the export lines of one name without parsing the file
+
+    Runs one bytes regex over a memory map of the file, so only matched
+    values are decoded. Returns (line, value) pairs in file order; the
+    0-based line numbers are only counted when with_lines is set.
+    """
+    import re
+    import mmap
+
+    pattern = re.compile(rb'export[ \t]+' + re.escape(name.encode()) + rb'=([^\n]*)')
+    try:
+        with open(config_file, 'rb') as f:
+            try:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return []  # Empty files cannot be mapped
+    except FileNotFoundError:
+        return []
+    found: List[Tuple[Optional[int], str]] = []
+    with mapping:
+        lineno, counted = 0, 0
+        for match in pattern.finditer(mapping):
+            start = match.start()
+            line_start = mapping.rfind(b'\n', 0, start) + 1
+            if line_start < start and mapping[line_start:start].strip(b' \t'):
+                continue
+            if with_lines:
+                lineno += mapping[counted:match.start()].count(b'\n')
+                counted = match.start()
+            value = match.group(1).decode('utf-8', 'surrogateescape').strip()
+            found.append((lineno if with_lines else None, value))
+    return found
+
+
+def rewrite_config(config_file: Path, updates: Dict[str, Optional[str]],
+                   positions: Optional[Dict[str, int]] = None) -> ConfigIndex:
+    """Stream a config file through a set of edits and atomically swap it in
+
+    updates maps a name to its new value, or to None to remove it; new
+    names are appended under the marker. positions gives absent names
+    their line number from before they were removed. Output goes to a
+    temp file that replaces the original. Returns the new index.
+    """
+    import shutil
+    import tempfile
+
+    target = config_file.resolve()
+    index = ConfigIndex({}, False, 0)
+    written = set()
+    unterminated = False
+    inserts = sorted((lineno, name) for name, lineno in (positions or {}).items()
+                     if updates.get(name) is not None)
+    inserted = 0
+
+    def write_insert(name: str) -> None:
+        line = ConfigLine(LINE_EXPORT, f"export {name}={updates[name]}\n",
+                          name, updates[name])
+        out.write(line.text)
+        index.add_line(line)
+        written.add(name)
+
+    fd, tmp_name = tempfile.mkstemp(dir=str(target.parent), prefix=f".{target.name}.",
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as out:
+            if target.exists():
+                with open(target, 'r') as src:
+                    for lineno, text in enumerate(src):
+                        # Lines put back so far shift the original numbering
+                        while inserted < len(inserts) and inserts[inserted][0] <= lineno + inserted:
+                            write_insert(inserts[inserted][1])
+                            inserted += 1
+                        line = tokenize_line(text)
+                        if line.kind == LINE_EXPORT and line.name in updates:
+                            value = updates[line.name]
+                            if value is None or line.name in written:
+                                continue
+                            written.add(line.name)
+                            line = ConfigLine(LINE_EXPORT, f"export {line.name}={value}\n",
+                                              line.name, value)
+                        out.write(line.text)
+                        index.add_line(line)
+                        unterminated = not line.text.endswith("\n")
+                shutil.copymode(target, tmp_name)
+
+            if inserted < len(inserts) and unterminated:
+                out.write("\n")
+                unterminated = False
+            for _, name in inserts[inserted:]:
+                write_insert(name)
+            appended = [(name, value) for name, value in updates.items()
+                        if value is not None and name not in written]
+            if appended:
+                if not index.has_marker:
+                    out.write(f"\n{MARKER_COMMENT}\n")
+                    if not unterminated:
+                        index.add_line(ConfigLine(LINE_OTHER, "\n"))
+                    index.add_line(ConfigLine(LINE_MARKER, f"{MARKER_COMMENT}\n"))
+                elif unterminated:
+                    out.write("\n")
+                for name, value in appended:
+                    line = ConfigLine(LINE_EXPORT, f"export {name}={value}\n", name, value)
+                    out.write(line.text)
+                    index.add_line(line)
+
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_name, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return index
+
+
+def silence_stdout() -> None:
+    """Point stdout at /dev/null after the reader went away
+
+    Keeps the interpreter's final flush from raising BrokenPipeError again.
+    """
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
+    except (OSError, ValueError, AttributeError):
+        pass  # stdout is not a real file, e.g. captured by the daemon
+
+
+def write_stream(chunks: Iterable, binary: bool = False) -> bool:
+    """Write a stream of text (or bytes, if binary) to stdout in large blocks
+
+    Output is joined into OUTPUT_CHUNK_SIZE blocks, so a long listing
+    costs a handful of writes instead of one per line, and nothing is
+    produced past the point where the reader closes the pipe. Returns
+    False in that case.
+    """
+    out = sys.stdout
+    empty = ''
+    if binary:
+        if hasattr(out, 'buffer'):
+            out.flush()
+            out, empty = out.buffer, b''
+        else:
+            # Captured text output (the daemon): carry raw bytes through
+            chunks = (os.fsdecode(chunk) for chunk in chunks)
+    block: list = []
+    size = 0
+    try:
+        for chunk in chunks:
+            block.append(chunk)
+            size += len(chunk)
+            if size >= OUTPUT_CHUNK_SIZE:
+                out.write(empty.join(block))
+                block, size = [], 0
+        out.write(empty.join(block))
+        out.flush()
+    except BrokenPipeError:
+        silence_stdout()
+        return False
+    return True
+
+
+LIST_FORMATS = ('text', 'json', 'jsonl', 'nul', 'env')
+
+
+def format_records(names: Iterable[str], values, fmt: str,
+                   definitions: Optional[Dict[str, list]] = None) -> Iterable:
+    """Render variables in a machine-readable list format
+
+    json is one object, jsonl one {"name", "value"} object per line, nul
+    NAME=VALUE records terminated by NUL bytes (like env -0; yields bytes,
+    so undecodable values pass through unchanged), and env shell-quoted
+    export lines that can be sourced (names that are not valid shell
+    identifiers are skipped).
+
+    With definitions, values are raw shell text from config files: json
+    and jsonl records carry a "definitions" list of {file, line, value}
+    (and json maps each name to {"value", "definitions"}), and env lines
+    repeat the raw text unquoted, as the config file has it.
+    """
+    if fmt in ('json', 'jsonl'):
+        import json
+
+        dumps = json.dumps
+
+        def sources(name: str) -> str:
+            return dumps([{'file': path, 'line': lineno + 1, 'value': value}
+                          for path, lineno, value in definitions[name]])
+
+        if fmt == 'jsonl':
+            for name in names:
+                extra = f', "definitions": {sources(name)}' if definitions is not None else ''
+                yield f'{{"name": {dumps(name)}, "value": {dumps(values[name])}{extra}}}\n'
+            return
+        separator = ''
+        yield '{'
+        for name in names:
+            if definitions is not None:
+                record = f'{{"value": {dumps(values[name])}, "definitions": {sources(name)}}}'
+            else:
+                record = dumps(values[name])
+            yield f'{separator}{dumps(name)}: {record}'
+            separator = ', '
+        yield '}\n'
+    elif fmt == 'nul':
+        for name in names:
+            yield os.fsencode(name) + b'=' + os.fsencode(values[name]) + b'\0'
+    elif fmt == 'env':
+        import shlex
+
+        name_re = compiled(NAME_PATTERN)
+        quote = shlex.quote if definitions is None else str
+        for name in names:
+            if name_re.fullmatch(name):
+                yield f"export {name}={quote(values[name])}\n"
+    else:
+        raise ValueError(f"Unknown format '{fmt}'")
+
+
+def write_json_atomic(path: Path, data: dict) -> None:
+    """Write owner-only JSON next to path and rename it into place
+
+    Caches and spool entries hold exported values, so they get the same
+    0600 mode as the journal.
+    """
+    import json
+
+    # dumps, not dump: dump streams through the pure-Python encoder
+    write_text_atomic(path, json.dumps(data))
+
+
+def write_text_atomic(path: Path, text: str, mode: int = 0o600) -> None:
+    """Write text next to path with the given mode and rename it into place"""
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        os.unlink(tmp)  # Left over by a crashed process with our pid
+    except FileNotFoundError:
+        pass
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def restrict_to_owner(f) -> None:
+    """Make an open file owner-only if an older version left it readable"""
+    fd = f.fileno()
+    if os.fstat(fd).st_mode & 0o077:
+        os.fchmod(fd, 0o600)
+
+
+def stat_signature(st: os.stat_result) -> List[int]:
+    """Identity of a file version: inode, mtime in nanoseconds and size"""
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+def _cache_dir_path() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'configkeys')
+
+
+def default_cache_dir() -> Path:
+    """Directory for disposable configkeys state (parse cache, daemon socket)"""
+    from pathlib import Path
+
+    return Path(_cache_dir_path())
+
+
+class ParseCache:
+    """On-disk cache of ConfigIndex objects keyed by the file's stat signature"""
+
+    VERSION = 2
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        # Process-local layer in front of the files; keeps a long-running
+        # daemon from re-reading JSON while the config is unchanged
+        self._memory: Dict[str, Tuple[List[int], ConfigIndex]] = {}
+
+    def _entry_path(self, config_file: Path) -> Path:
+        # zlib checksums rather than hashlib: loading OpenSSL costs more than
+        # the whole lookup, and entries record their path, so a collision is
+        # just a cache miss
+        import zlib
+
+        raw = str(config_file).encode()
+        key = f"{zlib.crc32(raw):08x}{zlib.adler32(raw):08x}"
+        return self.cache_dir / f"parse-{key}.json"
+
+    def load(self, config_file: Path, st: os.stat_result) -> Optional[ConfigIndex]:
+        """Return the cached index if it was built from this exact file version"""
+        signature = stat_signature(st)
+        remembered = self._memory.get(str(config_file))
+        if remembered is not None and remembered[0] == signature:
+            return remembered[1]
+        import json
+
+        try:
+            with open(self._entry_path(config_file), 'r') as f:
+                restrict_to_owner(f)
+                data = json.load(f)
+            if (data.get('version') != self.VERSION
+                    or data.get('path') != str(config_file)
+                    or data.get('stat') != signature):
+                return None
+            index = ConfigIndex.from_dict(data['index'])
+        except Exception:
+            return None
+        self._memory[str(config_file)] = (signature, index)
+        return index
+
+    def store(self, config_file: Path, st: os.stat_result, index: ConfigIndex) -> None:
+        """Save an index for the given file version, ignoring cache errors"""
+        self._memory[str(config_file)] = (stat_signature(st), index)
+        entry = self._entry_path(config_file)
+        data = {
+            'version': self.VERSION,
+            'path': str(config_file),
+            'stat': stat_signature(st),
+            'index': index.to_dict(),
+        }
+        try:
+            write_json_atomic(entry, data)
+        except Exception:
+            pass
+
+
+def config_dir() -> Path:
+    """Directory for files the user's shell reads (the generated env file)"""
+    from pathlib import Path
+
+    base = os.environ.get('XDG_CONFIG_HOME') or str(Path.home() / '.config')
+    return Path(base) / 'configkeys'
+
+
+def _data_dir_path() -> str:
+    base = (os.environ.get('XDG_DATA_HOME')
+            or os.path.join(os.path.expanduser('~'), '.local', 'share'))
+    return os.path.join(base, 'configkeys')
+
+
+def _expand_shell_words(text: str, known: Dict[str, str]) -> Optional[str]:
+    """Expand ~ and $NAME/${NAME} from known; None if anything else needs a shell"""
+    if text.startswith('~/') or text == '~':
+        if 'HOME' not in known:
+            return None
+        text = known['HOME'] + text[1:]
+    elif text.startswith('~'):
+        return None
+    unresolved = []
+
+    def substitute(match) -> str:
+        name = match.group(1) or match.group(2)
+        if name not in known:
+            unresolved.append(name)
+            return ''
+        return known[name]
+
+    text = compiled(rf'\$\{{({NAME_PATTERN})\}}|\$({NAME_PATTERN})').sub(substitute, text)
+    if unresolved or any(c in text for c in '$`*?[\\'):
+        return None
+    return text
+
+
+def expand_export_value(raw: str, known: Dict[str, str]) -> Optional[str]:
+    """Best-effort value of an export's raw right-hand side, None if not static"""
+    raw = raw.strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] == "'":
+        return raw[1:-1]
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        raw = raw[1:-1]
+    elif any(c in raw for c in ' \t;&|<>()"\''):
+        return None
+    return _expand_shell_words(raw, known)
+
+
+class IncludeResolver:
+    """Follows source/. lines from root configs to every reachable file
+
+    Only simple forms are followed: a literal path, optionally quoted,
+    using ~, $HOME and variables exported earlier in the traversal.
+    Loops, globs and command substitutions are skipped. The index of every
+    node is cached in a single JSON file keyed by each file's stat
+    signature, so a warm traversal costs one JSON read and one stat per
+    file, and only files that changed are parsed again.
+    """
+
+    VERSION = 1
+    MAX_DEPTH = 16
+
+    def __init__(self, cache_dir: Optional[Path] = None,
+                 parse_cache: Optional[ParseCache] = None):
+        self.path = (cache_dir or default_cache_dir()) / 'include-graph.json'
+        # Shared with the writers, so files they just rewrote are not re-parsed
+        self.parse_cache = parse_cache
+        self._nodes: Optional[Dict[str, Tuple[List[int], ConfigIndex]]] = None
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Tuple[List[int], ConfigIndex]]:
+        if self._nodes is None:
+            import json
+
+            self._nodes = {}
+            try:
+                with open(self.path, 'r') as f:
+                    # Holds the export values of every sourced file
+                    restrict_to_owner(f)
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    self._nodes = {path: (node['stat'], ConfigIndex.from_dict(node['index']))
+                                   for path, node in data['nodes'].items()}
+            except Exception:
+                pass
+        return self._nodes
+
+    def _save(self) -> None:
+        if not self._dirty:
+            return
+        data = {
+            'version': self.VERSION,
+            'nodes': {path: {'stat': signature, 'index': index.to_dict()}
+                      for path, (signature, index) in self._nodes.items()},
+        }
+        try:
+            write_json_atomic(self.path, data)
+            self._dirty = False
+        except Exception:
+            pass
+
+    def index_of(self, path: str) -> Optional[ConfigIndex]:
+        """Return the index of one file, parsing it only if it changed"""
+        nodes = self._load()
+        try:
+            st = os.stat(path)
+        except OSError:
+            if nodes.pop(path, None) is not None:
+                self._dirty = True
+            return None
+        signature = stat_signature(st)
+        node = nodes.get(path)
+        if node is not None and node[0] == signature:
+            return node[1]
+        index = self.parse_cache.load(path, st) if self.parse_cache is not None else None
+        if index is None:
+            try:
+                with open(path, 'r') as f:
+                    index = ConfigIndex.scan(f)
+            except (OSError, UnicodeDecodeError):
+                return None
+        nodes[path] = (signature, index)
+        self._dirty = True
+        return index
+
+    def resolve(self, roots: Iterable[Path],
+                home: str) -> Tuple[List[str], Dict[str, List[Tuple[str, int, str]]]]:
+        """Walk roots and everything they source, in the order a shell loads them
+
+        Returns the files visited and, for every exported name, its
+        definitions as (file, line, raw value) in override order: a
+        sourced file's exports land at the position of its source line.
+        Roots already reached from an earlier root are not walked again.
+        """
+        files: List[str] = []
+        definitions: Dict[str, List[Tuple[str, int, str]]] = {}
+        visited = set()
+        active = set()
+        known = {'HOME': home}
+
+        def visit(path: str, depth: int) -> None:
+            index = self.index_of(path)
+            if index is None:
+                return
+            files.append(path)
+            visited.add(path)
+            active.add(path)
+            events = [(lineno, 0, name, value) for name, entries in index.exports.items()
+                      for lineno, value in entries]
+            events += [(lineno, 1, raw, '') for lineno, raw in index.sources]
+            events.sort()
+            for lineno, kind, name, value in events:
+                if kind == 0:
+                    definitions.setdefault(name, []).append((path, lineno, value))
+                    expanded = expand_export_value(value, known)
+                    if expanded is None:
+                        known.pop(name, None)
+                    else:
+                        known[name] = expanded
+                    continue
+                target = _expand_shell_words(name, known)
+                if target is None or depth >= self.MAX_DEPTH:
+                    continue
+                target = os.path.normpath(os.path.join(home, target))
+                if target not in active:
+                    visit(target, depth + 1)
+            active.discard(path)
+
+        for root in roots:
+            if str(root) not in visited:
+                visit(str(root), 0)
+        self._save()
+        return files, definitions
+
+
+def data_dir() -> Path:
+    """Directory for persistent configkeys state (backups, journal)"""
+    from pathlib import Path
+
+    return Path(_data_dir_path())
+
+
+class BackupStore:
+    """Content-addressed, zlib-compressed store of config file snapshots
+
+    Each distinct file version is stored once under objects/ keyed by its
+    sha256; index.json maps snapshot timestamps to hashes. Snapshotting a
+    file whose stat signature or content matches its last snapshot costs
+    a lookup, not a copy, so disk use grows with distinct versions only.
+    """
+
+    def __init__(self, root: Optional[Path] = None, keep: Optional[int] = None):
+        self.root = root or data_dir() / 'backups'
+        if keep is None:
+            try:
+                keep = int(os.environ.get('CONFIGKEYS_BACKUP_KEEP', DEFAULT_BACKUP_KEEP))
+            except ValueError:
+                keep = DEFAULT_BACKUP_KEEP
+        self.keep = keep
+        self.index_file = self.root / 'index.json'
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / 'objects' / digest[:2] / f"{digest[2:]}.z"
+
+    def load_index(self) -> dict:
+        import json
+
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {'snapshots': [], 'last': {}}
+
+    def snapshot(self, config_file: Path) -> Tuple[Optional[str], bool]:
+        """Store the current content of config_file
+
+        Returns (hash, created) where created is False when this exact
+        content was already the latest snapshot of the file.
+        """
+        if not config_file.exists():
+            return None, False
+        index = self.load_index()
+        source = str(config_file)
+        last = index['last'].get(source, {})
+        signature = stat_signature(config_file.stat())
+        if last.get('stat') == signature:
+            return last['hash'], False
+
+        digest, size = self._store_object(config_file)
+        created = last.get('hash') != digest
+        if created:
+            from datetime import datetime
+
+            index['snapshots'].append({
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'hash': digest,
+                'source': source,
+                'size': size,
+            })
+        index['last'][source] = {'stat': signature, 'hash': digest}
+        if created and len(index['snapshots']) > self.keep:
+            self._prune(index, self.keep, None)
+        write_json_atomic(self.index_file, index)
+        return digest, created
+
+    def _store_object(self, config_file: Path) -> Tuple[str, int]:
+        """Hash and compress a file in one streaming pass, deduplicating by hash"""
+        import zlib
+        import hashlib
+        import tempfile
+
+        self.root.joinpath('objects').mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        compressor = zlib.compressobj()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=str(self.root / 'objects'), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(config_file, 'rb') as src:
+                for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(compressor.compress(chunk))
+                out.write(compressor.flush())
+            target = self._object_path(digest.hexdigest())
+            if target.exists():
+                os.unlink(tmp_name)
+            else:
+                target.parent.mkdir(exist_ok=True)
+                os.replace(tmp_name, target)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        return digest.hexdigest(), size
+
+    def resolve(self, ref: str) -> Optional[dict]:
+        """Find a snapshot by list position (1 = newest) or hash prefix"""
+        snapshots = self.load_index()['snapshots']
+        if ref.isdigit() and 0 < int(ref) <= len(snapshots):
+            return snapshots[-int(ref)]
+        matches = {snap['hash'] for snap in snapshots if snap['hash'].startswith(ref)}
+        if len(matches) != 1:
+            return None
+        return next(snap for snap in reversed(snapshots) if snap['hash'] in matches)
+
+    def restore(self, digest: str, target: Path) -> None:
+        """Decompress a snapshot over target through a temp file and os.replace"""
+        import zlib
+        import shutil
+        import tempfile
+
+        target = target.resolve()
+        decompressor = zlib.decompressobj()
+        fd, tmp_name = tempfile.mkstemp(dir=str(target.parent), prefix=f".{target.name}.",
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(self._object_path(digest), 'rb') as src:
+                for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                    out.write(decompressor.decompress(chunk))
+                out.write(decompressor.flush())
+            if target.exists():
+                shutil.copymode(target, tmp_name)
+            os.replace(tmp_name, target)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+    def prune(self, keep: Optional[int] = None, max_age_days: Optional[float] = None) -> int:
+        """Apply retention and delete unreferenced objects; returns snapshots dropped"""
+        index = self.load_index()
+        dropped = self._prune(index, self.keep if keep is None else keep, max_age_days)
+        write_json_atomic(self.index_file, index)
+        return dropped
+
+    def _prune(self, index: dict, keep: int, max_age_days: Optional[float]) -> int:
+        snapshots = index['snapshots']
+        kept = snapshots[-keep:] if keep > 0 else []
+        if max_age_days is not None:
+            from datetime import datetime
+
+            cutoff = datetime.now().timestamp() - max_age_days * 86400
+            kept = [snap for snap in kept
+                    if datetime.fromisoformat(snap['time']).timestamp() >= cutoff]
+        index['snapshots'] = kept
+
+        # The latest version of each file stays referenced for deduplication
+        live = {snap['hash'] for snap in kept}
+        live.update(last['hash'] for last in index['last'].values())
+        objects_dir = self.root / 'objects'
+        if objects_dir.exists():
+            for obj in objects_dir.glob('*/*.z'):
+                if obj.parent.name + obj.stem not in live:
+                    obj.unlink()
+        return len(snapshots) - len(kept)
+
+
+class Journal:
+    """Append-only log of set/remove operations, grouped into transactions
+
+    Each invocation writes its entries (op, name, old and new value, line
+    position) in one O_APPEND write before touching the config, so undo
+    is a walk over the tail of the log instead of a whole-file restore.
+    A failed write is followed by an abort record for its transaction.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or data_dir() / 'journal.jsonl'
+
+    def _append(self, records: List[dict]) -> None:
+        import json
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(record) + "\n" for record in records).encode()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def record(self, indexes: Dict[Path, Optional[ConfigIndex]],
+               batches: List[Dict[Path, Dict[str, Optional[str]]]]) -> List[str]:
+        """Log batches of edits, one transaction per batch
+
+        Each batch maps a config file to its edits; indexes holds the
+        current index of every file involved. Batches are applied in
+        order, so old values for later batches take earlier batches into
+        account. Returns the transaction ids.
+        """
+        import time
+        from datetime import datetime
+
+        stamp = datetime.now().isoformat(timespec='seconds')
+        overlay: Dict[Tuple[str, str], Optional[str]] = {}
+        records = []
+        txns = []
+        for number, batch in enumerate(batches):
+            if not any(batch.values()):
+                continue
+            txn = f"{time.time_ns():x}-{os.getpid()}-{number}"
+            txns.append(txn)
+            for config_file, updates in batch.items():
+                index = indexes.get(config_file)
+                for name, new in updates.items():
+                    entries = index.exports.get(name) if index is not None else None
+                    key = (str(config_file), name)
+                    if key in overlay:
+                        old, line = overlay[key], None
+                    else:
+                        old = entries[-1][1] if entries else None
+                        line = entries[0][0] if entries else None
+                    records.append({
+                        'txn': txn,
+                        'time': stamp,
+                        'op': 'set' if new is not None else 'remove',
+                        'file': str(config_file),
+                        'name': name,
+                        'old': old,
+                        'new': new,
+                        'line': line,
+                    })
+            for config_file, updates in batch.items():
+                overlay.update(((str(config_file), name), new) for name, new in updates.items())
+        if records:
+            self._append(records)
+        return txns
+
+    def abort(self, txns: List[str]) -> None:
+        """Mark transactions as never applied"""
+        try:
+            self._append([{'txn': txn, 'op': 'abort'} for txn in txns])
+        except Exception:
+            pass
+
+    def _read(self) -> List[Tuple[int, dict]]:
+        """Return (byte offset, record) pairs for the whole log"""
+        import json
+
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                offset = 0
+                for raw in f:
+                    try:
+                        records.append((offset, json.loads(raw)))
+                    except ValueError:
+                        pass  # Torn tail from a crashed writer
+                    offset += len(raw)
+        except FileNotFoundError:
+            pass
+        return records
+
+    def transactions(self) -> List[Tuple[int, str, List[dict]]]:
+        """Return committed transactions in order as (offset, txn, entries)"""
+        grouped: Dict[str, Tuple[int, List[dict]]] = {}
+        aborted = set()
+        for offset, record in self._read():
+            if record.get('op') == 'abort':
+                aborted.add(record['txn'])
+                continue
+            grouped.setdefault(record['txn'], (offset, []))[1].append(record)
+        return [(offset, txn, entries) for txn, (offset, entries) in grouped.items()
+                if txn not in aborted]
+
+    def truncate(self, offset: int) -> None:
+        """Forget every record from offset on"""
+        os.truncate(self.path, offset)
+
+
+class GenerationLog:
+    """Generation counter of the managed variables plus what each generation changed
+
+    The counter is a one-line text file so the shell hook can check it
+    with a builtin read before every prompt; changes.jsonl maps each
+    generation to the names it set or unset, so a session that fell
+    behind replays just the delta instead of re-sourcing its rc file.
+    Only the tail of the log is kept; sessions older than that resync.
+    """
+
+    MAX_LOG_BYTES = 256 * 1024
+
+    def __init__(self, root: Optional[Path] = None):
+        root = root or data_dir()
+        self.counter_path = root / 'generation'
+        self.log_path = root / 'changes.jsonl'
+        self.state_path = root / 'session-state'
+
+    def current(self) -> int:
+        try:
+            with open(self.counter_path, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self, changes: Dict[str, Optional[str]]) -> int:
+        """Record a change set as the next generation; the caller holds the config lock"""
+        import json
+
+        generation = self.current() + 1
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        # Log before counter, so a hook that sees the new number finds its entry.
+        # It holds raw values, so it is owner-only like the journal
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        with os.fdopen(fd, 'a') as f:
+            restrict_to_owner(f)
+            f.write(json.dumps({'gen': generation, 'changes': changes}) + "\n")
+        if self.log_path.stat().st_size > self.MAX_LOG_BYTES:
+            self._trim()
+        write_text_atomic(self.counter_path, f"{generation}\n")
+        return generation
+
+    def _trim(self) -> None:
+        """Keep the newer half of the change log"""
+        with open(self.log_path, 'r') as f:
+            lines = f.readlines()
+        write_text_atomic(self.log_path, "".join(lines[len(lines) // 2:]))
+
+    def load_state(self) -> Tuple[List[Tuple[str, str]], str]:
+        """Return the (name, kind) entries and fingerprint of the session state file"""
+        try:
+            with open(self.state_path, 'r') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return [], ''
+        return [tuple(line.split('\t', 1)) for line in lines[2:]], lines[1]
+
+    def write_state(self, generation: int, entries: List[Tuple[str, str]],
+                    expected: Dict[str, str]) -> None:
+        """Save what an up-to-date session looks like, for status --prompt"""
+        text = f"{generation}\n{session_fingerprint(entries, expected)}\n"
+        text += "".join(f"{name}\t{kind}\n" for name, kind in entries)
+        write_text_atomic(self.state_path, text)
+
+    def since(self, generation: int) -> Tuple[int, Optional[Dict[str, Optional[str]]]]:
+        """Merge the changes made after generation
+
+        Returns (latest generation, changes), where changes is None when
+        the log no longer reaches back to generation or never got there.
+        """
+        import json
+
+        merged: Dict[str, Optional[str]] = {}
+        latest = generation
+        try:
+            with open(self.log_path, 'r') as f:
+                for raw in f:
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if record['gen'] <= generation:
+                        continue
+                    if record['gen'] != latest + 1:
+                        return self.current(), None
+                    merged.update(record['changes'])
+                    latest = record['gen']
+        except FileNotFoundError:
+            pass
+        if latest < self.current() or generation > self.current():
+            return self.current(), None
+        return latest, merged
+
+
+def session_fingerprint(entries: Iterable[Tuple[str, str]], values) -> str:
+    """CRC of how a set of variables looks in an environment mapping
+
+    Each entry is (name, kind): '=' compares the exact value (for literal
+    values), '?' only whether the name is set, '-' that it is not set.
+    """
+    import zlib
+
+    crc = 0
+    for name, kind in entries:
+        value = values.get(name)
+        seen = value if kind == '=' and value is not None else value is not None
+        crc = zlib.crc32(f"{name}{kind}{seen}\n".encode(), crc)
+    return f"{crc:08x}"
+
+
+def prompt_status(environ) -> str:
+    """Return the stale-session marker for a prompt, or '' when up to date
+
+    Runs on every prompt render, so it stays on builtins and reads at most
+    two tiny files. Sessions with the hook compare $_CONFIGKEYS_GEN to the
+    generation counter; others are fingerprinted against session-state.
+    """
+    root = _data_dir_path()
+    marker = environ.get('CONFIGKEYS_PROMPT_MARKER', '⟳')
+    session_generation = environ.get('_CONFIGKEYS_GEN')
+    if session_generation is not None:
+        try:
+            with open(os.path.join(root, 'generation'), 'r') as f:
+                current = f.read().strip()
+        except OSError:
+            current = '0'
+        return '' if current == session_generation else marker
+    try:
+        with open(os.path.join(root, 'session-state'), 'r') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return ''
+    entries = [line.split('\t', 1) for line in lines[2:]]
+    return '' if session_fingerprint(entries, environ) == lines[1] else marker
+
+
+class CommitQueue:
+    """Config lock plus a spool of pending edits for group commit
+
+    Writers drop their request into the spool and then wait for an
+    exclusive fcntl lock. Whoever gets the lock first becomes the leader:
+    it applies every spooled request in one commit and leaves a result
+    file for the others, who find it when they get the lock in turn and
+    return without writing. N concurrent writers thus cost about one
+    rewrite. The lock lives on a separate file because the config itself
+    is replaced by rename on every write.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        root = root or data_dir()
+        self.lock_path = root / 'lock'
+        self.spool = root / 'pending'
+
+    def locked(self) -> 'ConfigLock':
+        """Context manager holding the exclusive config lock"""
+        return ConfigLock(self.lock_path)
+
+    def submit(self, request: dict,
+               apply: Callable[[List[dict]], List[dict]]) -> dict:
+        """Queue request and return its result once it has been committed
+
+        apply receives every pending request in arrival order and returns
+        one result dict per request.
+        """
+        import json
+        import time
+
+        request_id = f"{time.time_ns():020d}-{os.getpid()}"
+        write_json_atomic(self.spool / f"{request_id}.json", request)
+
+        with self.locked():
+            done = self.spool / f"{request_id}.done"
+            if done.exists():
+                # Another writer committed our request while we waited
+                with open(done, 'r') as f:
+                    result = json.load(f)
+                done.unlink()
+                return result
+
+            batch = self._collect()
+            try:
+                results = apply([pending for _, _, pending in batch])
+            except Exception as e:
+                results = [{'error': str(e)} for _ in batch]
+
+            own = {'error': 'request was not found in the commit queue'}
+            for (path, pending_id, _), result in zip(batch, results):
+                if pending_id == request_id:
+                    own = result
+                else:
+                    write_json_atomic(self.spool / f"{pending_id}.done", result)
+                path.unlink()
+            return own
+
+    def _collect(self) -> List[Tuple[Path, str, dict]]:
+        """Load spooled requests in arrival order, dropping those of dead writers"""
+        import json
+
+        batch = []
+        for path in sorted(self.spool.glob('*.json')):
+            request_id = path.stem
+            alive = _pid_alive(int(request_id.rsplit('-', 1)[1]))
+            if not alive:
+                path.unlink()
+                continue
+            try:
+                with open(path, 'r') as f:
+                    batch.append((path, request_id, json.load(f)))
+            except (OSError, ValueError):
+                path.unlink()
+        for path in self.spool.glob('*.done'):
+            if not _pid_alive(int(path.stem.rsplit('-', 1)[1])):
+                path.unlink()
+        return batch
+
+
+class ConfigLock:
+    """Exclusive fcntl lock on a lock file, usable as a context manager"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.fd: Optional[int] = None
+
+    def __enter__(self) -> 'ConfigLock':
+        import fcntl
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(self.fd)
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        import fcntl
+
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MacEnvManager:
+    # File-backed attributes, built on first access by _init_storage so that
+    # commands which only read the environment never import pathlib
+    _STORAGE_ATTRS = frozenset({'shell_config_files', 'primary_config', 'env_file',
+                                'parse_cache', 'includes', 'backup_store', 'journal',
+                                'generations', 'commit_queue'})
+
+    def __init__(self):
+        # Environment of the calling session; the daemon swaps in the client's
+        self.environ = os.environ
+
+    def __getattr__(self, name: str):
+        if name in MacEnvManager._STORAGE_ATTRS:
+            self._init_storage()
+            return self.__dict__[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def _init_storage(self) -> None:
+        from pathlib import Path
+
+        self.shell_config_files = [
+            Path.home() / '.zshrc',
+            Path.home() / '.bash_profile',
+            Path.home() / '.bashrc'
+        ]
+        self.primary_config = Path.home() / '.zshrc'  # Primary for macOS with zsh
+        # Managed variables live here; the primary config sources it
+        self.env_file = config_dir() / 'env.zsh'
+        self.parse_cache = ParseCache()
+        self.includes = IncludeResolver(parse_cache=self.parse_cache)
+        self.backup_store = BackupStore()
+        self.journal = Journal()
+        self.generations = GenerationLog()
+        self.commit_queue = CommitQueue()
+
+    def get_current_env_vars(self) -> Dict[str, str]:
+        """Get all current environment variables"""
+        return dict(self.environ)
+
+    def list_env_vars(self, filter_pattern: Optional[str] = None,
+                      limit: Optional[int] = None, fmt: str = 'text',
+                      list_filter: Optional[ListFilter] = None) -> None:
+        """List environment variables, optionally filtered by pattern"""
+        if list_filter is None:
+            list_filter = ListFilter([filter_pattern] if filter_pattern else [])
+        self._write_listing(self.environ, list_filter, limit, fmt)
+
+    def list_config_vars(self, limit: Optional[int] = None, fmt: str = 'text',
+                         list_filter: Optional[ListFilter] = None) -> None:
+        """List variables exported by the shell config files and where each is defined"""
+        definitions = self.config_definitions()
+        values = {name: entries[-1][2] for name, entries in definitions.items()}
+        self._write_listing(values, list_filter or ListFilter(), limit, fmt, definitions)
+
+    def config_definitions(self) -> Dict[str, List[Tuple[str, int, str]]]:
+        """Map each name exported by the shell config files to its definitions
+
+        Definitions are (file, line, raw value) in override order: files in
+        the order of shell_config_files, each followed through the files
+        it sources, so the last one wins. The root files are parsed
+        concurrently; every node reuses the include graph cache.
+        """
+        from pathlib import Path
+        from concurrent.futures import ThreadPoolExecutor
+
+        files = self.shell_config_files
+        includes = self.includes
+        includes._load()
+        with ThreadPoolExecutor(max_workers=len(files)) as pool:
+            list(pool.map(includes.index_of, [str(path) for path in files]))
+        return includes.resolve(files, str(Path.home()))[1]
+
+    def reachable_definitions(self) -> Dict[str, List[Tuple[str, int, str]]]:
+        """Definitions of every export reachable from the primary config"""
+        from pathlib import Path
+
+        return self.includes.resolve([self.primary_config], str(Path.home()))[1]
+
+    def _warn_overrides(self, names: Iterable[str], removed: bool = False) -> None:
+        """Warn about names whose effective definition is not one configkeys manages
+
+        After a removal, any remaining definition (necessarily in a file
+        configkeys does not edit) is reported.
+        """
+        managed = {str(self.primary_config), str(self.env_file)}
+        try:
+            definitions = self.reachable_definitions()
+        except Exception:
+            return
+        for name in names:
+            entries = definitions.get(name)
+            if entries and removed:
+                for path, lineno in dict.fromkeys((path, lineno) for path, lineno, _ in entries):
+                    print(f"Warning: {name} is still exported at {path}:{lineno + 1}")
+            elif entries and entries[-1][0] not in managed:
+                path, lineno, _ = entries[-1]
+                print(f"Warning: {name} is also exported at {path}:{lineno + 1}, "
+                      f"which is loaded later and takes precedence")
+
+    def _write_listing(self, values, list_filter: ListFilter, limit: Optional[int],
+                       fmt: str, definitions: Optional[Dict[str, list]] = None) -> None:
+        """Filter, order and print variables
+
+        Names flow through a generator pipeline (filter, order, format)
+        into one buffered writer. With a limit, only the first names in
+        sorted order are selected with a bounded heap instead of sorting
+        every match. Formats other than text are complete and untruncated;
+        see format_records. With definitions (config listings), each
+        variable is followed by the file:line of every definition.
+        """
+        names = list_filter.select(values)
+        noun = ("variable(s) exported by shell config files" if definitions is not None
+                else "environment variable(s)")
+
+        if not names and fmt == 'text':
+            print(f"No {noun.replace('(s)', 's')} found" + 
+                  (f" matching {list_filter.describe()}" if list_filter else ""))
+            return
+
+        # Sort by key name for better readability
+        if limit is not None and limit < len(names):
+            import heapq
+
+            selected = heapq.nsmallest(limit, names)
+            header = f"\nFound {len(names)} {noun}, showing the first {limit}:\n"
+        else:
+            selected = sorted(names)
+            header = f"\nFound {len(names)} {noun}:\n"
+
+        if fmt != 'text':
+            write_stream(format_records(selected, values, fmt, definitions),
+                         binary=fmt == 'nul')
+            return
+
+        def lines() -> Iterable[str]:
+            yield header
+            yield "-" * 50 + "\n"
+            for key in selected:
+                value = values[key]
+                # Truncate very long values for readability
+                display_value = value if len(value) <= 100 else value[:97] + "..."
+                yield f"{key}={display_value}\n"
+                if definitions is not None:
+                    entries = definitions[key]
+                    for position, (path, lineno, _) in enumerate(entries, 1):
+                        status = "" if position == len(entries) else " (overridden)"
+                        yield f"    {path}:{lineno + 1}{status}\n"
+
+        write_stream(lines())
+
+    def scan_shell_config(self, config_file: Optional[Path] = None) -> ConfigIndex:
+        """Stream a shell configuration file (the primary one by default) into a fresh index"""
+        config_file = config_file or self.primary_config
+        try:
+            st = config_file.stat()
+            with open(config_file, 'r') as f:
+                index = ConfigIndex.scan(f)
+        except FileNotFoundError:
+            return ConfigIndex({}, False, 0)
+        except Exception as e:
+            print(f"Error reading {config_file}: {e}")
+            return ConfigIndex({}, False, 0)
+        self.parse_cache.store(config_file, st, index)
+        return index
+
+    def load_config_index(self, config_file: Optional[Path] = None) -> Optional[ConfigIndex]:
+        """Return the export index of a config (the primary one by default), or None if it is missing
+
+        The file is only read and parsed when its inode, mtime or size no
+        longer match the cached index.
+        """
+        config_file = config_file or self.primary_config
+        try:
+            st = config_file.stat()
+        except OSError:
+            return None
+        index = self.parse_cache.load(config_file, st)
+        if index is None:
+            index = self.scan_shell_config(config_file)
+        return index
+
+    def env_source_line(self) -> str:
+        """The line the primary config uses to source the env file"""
+        from pathlib import Path
+
+        home = Path.home()
+        try:
+            path = f'"$HOME/{self.env_file.relative_to(home)}"'
+        except ValueError:
+            path = f'"{self.env_file}"'
+        return f"source {path}\n"
+
+    def sources_env_file(self, index: Optional[ConfigIndex]) -> bool:
+        """Whether a config index contains a source line for the env file"""
+        if index is None:
+            return False
+        target = os.path.realpath(self.env_file)
+        return any(os.path.realpath(os.path.expanduser(os.path.expandvars(path))) == target
+                   for _, path in index.sources)
+
+    def _install_env_source(self) -> ConfigIndex:
+        """Append the env file's source line (under the marker) to the primary config"""
+        return self._append_lines(self.primary_config, self.load_config_index(),
+                                  [self.env_source_line()])
+
+    def _create_env_file(self) -> ConfigIndex:
+        """Write an owner-only env file holding only its header"""
+        write_text_atomic(self.env_file, ENV_FILE_HEADER)
+        return self.scan_shell_config(self.env_file)
+
+    def compile_env_file(self) -> bool:
+        """Precompile the env file to zsh wordcode if its content changed
+
+        zsh sources env.zsh.zwc in place of env.zsh whenever the .zwc is
+        newer, skipping the parse at every shell startup. The content hash
+        of the last compiled version is kept in the cache directory, so
+        rewrites that leave the content unchanged only refresh the .zwc
+        timestamp. Skipped when CONFIGKEYS_ZCOMPILE=0 or zsh is missing;
+        CONFIGKEYS_ZSH names the zsh binary to use.
+        """
+        import json
+        import zlib
+        import shutil
+        import subprocess
+
+        if os.environ.get('CONFIGKEYS_ZCOMPILE') == '0':
+            return False
+        zsh = os.environ.get('CONFIGKEYS_ZSH') or shutil.which('zsh')
+        if not zsh:
+            return False
+
+        source = self.env_file
+        wordcode = source.with_name(f"{source.name}.zwc")
+        try:
+            with open(source, 'rb') as f:
+                digest = f"{zlib.crc32(f.read()):08x}"
+        except OSError:
+            return False
+        state_file = default_cache_dir() / 'zcompile.json'
+        try:
+            with open(state_file, 'r') as f:
+                state = json.load(f)
+        except Exception:
+            state = {}
+        if state.get(str(source)) == digest and wordcode.exists():
+            os.utime(wordcode)
+            return True
+
+        # zcompile appends .zwc to any output name lacking it; compiling to a
+        # temp name and renaming keeps starting shells from reading a torn file
+        tmp = source.with_name(f".{source.name}.{os.getpid()}.zwc")
+        try:
+            subprocess.run([zsh, '-fc', 'zcompile -U "$1" "$2"', 'zcompile', str(tmp), str(source)],
+                           check=True, capture_output=True, timeout=10)
+            os.replace(tmp, wordcode)
+        except Exception as e:
+            print(f"Warning: Could not zcompile {source}: {e}")
+            for path in (tmp, wordcode):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            return False
+        state[str(source)] = digest
+        try:
+            write_json_atomic(state_file, state)
+        except Exception:
+            pass
+        return True
+
+    def _rewrite_config(self, config_file: Path,
+                        updates: Dict[str, Optional[str]]) -> ConfigIndex:
+        """Apply edits to a config file and refresh its cached index"""
+        index = rewrite_config(config_file, updates)
+        self.parse_cache.store(config_file, config_file.stat(), index)
+        return index
+
+    def _append_exports(self, config_file: Path, index: Optional[ConfigIndex],
+                        updates: Dict[str, str]) -> ConfigIndex:
+        """Append new exports to a config file; only valid for names not exported yet"""
+        return self._append_lines(config_file, index, [f"export {name}={value}\n"
+                                                       for name, value in updates.items()])
+
+    def _append_lines(self, config_file: Path, index: Optional[ConfigIndex],
+                      lines: List[str]) -> ConfigIndex:
+        """Append lines under the marker comment with a single O_APPEND write
+
+        The cached index is extended in place so the next invocation does
+        not re-parse the file.
+        """
+        if index is None:
+            index = ConfigIndex({}, False, 0)
+
+        fd = os.open(config_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            unterminated = size > 0 and os.pread(fd, 1, size - 1) != b"\n"
+            if not index.has_marker:
+                # A blank line before the marker, unless the newline ends a partial line
+                lines = ([] if unterminated else ["\n"]) + [f"{MARKER_COMMENT}\n"] + lines
+            text = ("\n" if unterminated else "") + "".join(lines)
+            os.write(fd, text.encode())
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+
+        for text in lines:
+            index.add_line(tokenize_line(text))
+        self.parse_cache.store(config_file, st, index)
+        return index
+
+    def _apply_updates(self, config_file: Path, index: Optional[ConfigIndex],
+                       updates: Dict[str, Optional[str]]) -> ConfigIndex:
+        """Write edits to a config file using the cheapest strategy
+
+        Pure additions of new names are appended; anything that replaces
+        or removes an existing line goes through the streaming rewrite.
+        """
+        if all(value is not None and (index is None or name not in index)
+               for name, value in updates.items()):
+            return self._append_exports(config_file, index, updates)
+        return self._rewrite_config(config_file, updates)
+
+    def _commit(self, request: dict) -> dict:
+        """Queue an edit request and return its result once committed
+
+        A request may hold 'set' (name -> value), 'remove' (names) and
+        'globs'/'regexes' (removal patterns). The result lists what was
+        'set' and 'removed', names that were 'missing', the 'files' that
+        were edited, and any 'error'.
+        """
+        return self.commit_queue.submit(request, self._commit_batch)
+
+    def _commit_batch(self, requests: List[dict]) -> List[dict]:
+        """Apply a group of queued requests with one backup and one write per file
+
+        Runs under the config lock. Requests are resolved in order against
+        the current indexes plus the edits of earlier requests in the
+        group, and each becomes its own journal transaction. New variables
+        go to the env file; a variable already exported by the primary
+        config is edited there, so the two never disagree.
+        """
+        config_file = self.primary_config
+        env_file = self.env_file
+        indexes = {config_file: self.load_config_index(config_file),
+                   env_file: self.load_config_index(env_file)}
+        pending: Dict[Path, Dict[str, Optional[str]]] = {config_file: {}, env_file: {}}
+        batches = []
+        results = []
+
+        def exported(path: Path, name: str) -> bool:
+            if name in pending[path]:
+                return pending[path][name] is not None
+            return indexes[path] is not None and name in indexes[path]
+
+        def present(name: str) -> bool:
+            return exported(config_file, name) or exported(env_file, name)
+
+        def current(path: Path, name: str) -> Optional[str]:
+            if name in pending[path]:
+                return pending[path][name]
+            return indexes[path].get(name) if indexes[path] is not None else None
+
+        for request in requests:
+            updates: Dict[str, Optional[str]] = dict(request.get('set', {}))
+            result: dict = {'missing': []}
+            for name in request.get('remove', []):
+                if present(name):
+                    updates[name] = None
+                elif name not in updates:
+                    result['missing'].append(name)
+            if request.get('globs') or request.get('regexes'):
+                try:
+                    matcher = NameMatcher(request.get('globs', []), request.get('regexes', []))
+                except ValueError as e:
+                    results.append({'error': f"Invalid pattern {e}"})
+                    batches.append({})
+                    continue
+                candidates = {}
+                for path, index in indexes.items():
+                    candidates.update(dict.fromkeys(index.exports if index is not None else ()))
+                    candidates.update(dict.fromkeys(name for name, value in pending[path].items()
+                                                    if value is not None))
+                for name in candidates:
+                    if name not in updates and present(name) and matcher.matches(name):
+                        updates[name] = None
+
+            batch: Dict[Path, Dict[str, Optional[str]]] = {config_file: {}, env_file: {}}
+            result['unchanged'] = []
+            result['set'] = {}
+            for name, value in updates.items():
+                if value is None:
+                    for path in batch:
+                        if exported(path, name):
+                            batch[path][name] = None
+                    continue
+                target = config_file if exported(config_file, name) else env_file
+                if current(target, name) == value:
+                    # Already in effect: no backup, journal entry, write or generation
+                    result['unchanged'].append(name)
+                else:
+                    batch[target][name] = value
+                    result['set'][name] = value
+            result['removed'] = [name for name, value in updates.items() if value is None]
+            result['files'] = [str(path) for path, edits in batch.items() if edits]
+            for path, edits in batch.items():
+                pending[path].update(edits)
+            batches.append(batch)
+            results.append(result)
+
+        if not any(pending.values()):
+            return results
+
+        install_source = (bool(pending[env_file])
+                          and not self.sources_env_file(indexes[config_file]))
+        for path in (config_file, env_file):
+            if pending[path] or (path == config_file and install_source):
+                # Create backup
+                if not self.backup_config_file(path):
+                    print("Warning: Could not create backup, proceeding anyway...")
+
+        txns = self.journal.record(indexes, batches)
+        try:
+            config_file.parent.mkdir(exist_ok=True)
+            if pending[env_file] and indexes[env_file] is None:
+                indexes[env_file] = self._create_env_file()
+            for path, index in indexes.items():
+                if pending[path]:
+                    self._apply_updates(path, index, pending[path])
+            # Only after the env file exists, so the shell never sources a missing file
+            if install_source:
+                self._install_env_source()
+        except Exception as e:
+            self.journal.abort(txns)
+            for result in results:
+                result.setdefault('error', str(e))
+            return results
+        if pending[env_file]:
+            self.compile_env_file()
+        self._bump_generation({**pending[config_file], **pending[env_file]})
+        return results
+
+    def _bump_generation(self, changes: Dict[str, Optional[str]]) -> None:
+        """Publish applied changes to shells running the configkeys hook"""
+        if not changes:
+            return
+        try:
+            generation = self.generations.bump(changes)
+            self._write_session_state(generation, changes)
+        except Exception as e:
+            print(f"Warning: Could not record generation: {e}")
+
+    def _write_session_state(self, generation: int, changes: Dict[str, Optional[str]]) -> None:
+        """Record the expected session view of the managed variables
+
+        Literal values are compared exactly, anything the shell expands
+        only for presence. Removed names are remembered until set again,
+        since a stale session still has them.
+        """
+        index = self.load_config_index(self.env_file)
+        literal = compiled(LITERAL_VALUE_PATTERN)
+        entries = []
+        expected = {}
+        for name in (index.exports if index is not None else ()):
+            value = index.get(name)
+            if literal.match(value):
+                entries.append((name, '='))
+                expected[name] = value
+            else:
+                entries.append((name, '?'))
+                expected[name] = ''
+        previous, _ = self.generations.load_state()
+        removed = dict.fromkeys(name for name, kind in previous if kind == '-')
+        removed.update(dict.fromkeys(name for name, value in changes.items() if value is None))
+        entries += [(name, '-') for name in removed if name not in expected]
+        self.generations.write_state(generation, entries, expected)
+
+    def _print_reload_hint(self, files: Iterable[str]) -> None:
+        """Tell the user how the current session picks up a change"""
+        if '_CONFIGKEYS_GEN' in self.environ:
+            print("✓ Shells running the configkeys hook pick this up at their next prompt")
+            return
+        print("\nTo use in current session, run:")
+        for file_name in files:
+            print(f"  source {file_name}")
+        print("Or start a new terminal session")
+        print("(Add 'eval \"$(configkeys hook zsh)\"' to ~/.zshrc to reload changes automatically)")
+
+    def backup_config_file(self, config_file: Path) -> bool:
+        """Snapshot the configuration file into the backup store"""
+        try:
+            digest, created = self.backup_store.snapshot(config_file)
+            if created:
+                print(f"✓ Backup saved: {digest[:12]} ({self.backup_store.root})")
+            return True
+        except Exception as e:
+            print(f"Error creating backup: {e}")
+            return False
+
+    def list_backups(self) -> None:
+        """Show stored snapshots, newest first"""
+        snapshots = self.backup_store.load_index()['snapshots']
+        if not snapshots:
+            print("No backups found")
+            return
+        print(f"\nFound {len(snapshots)} backup(s) in {self.backup_store.root}:")
+        print("-" * 50)
+        for position, snap in enumerate(reversed(snapshots), 1):
+            print(f"{position:>3}  {snap['time']}  {snap['hash'][:12]}  "
+                  f"{snap['size']:>8} bytes  {snap['source']}")
+
+    def restore_backup(self, ref: str) -> bool:
+        """Restore a snapshot over the file it was taken from"""
+        snap = self.backup_store.resolve(ref)
+        if snap is None:
+            print(f"Error: No unique backup matches '{ref}'")
+            return False
+        from pathlib import Path
+
+        target = Path(snap['source'])
+        with self.commit_queue.locked():
+            return self._restore_backup(snap, target)
+
+    def _restore_backup(self, snap: dict, target: Path) -> bool:
+        if not self.backup_config_file(target):
+            print("Warning: Could not back up current file, proceeding anyway...")
+        before = self.load_config_index(target) or ConfigIndex({}, False, 0)
+        try:
+            self.backup_store.restore(snap['hash'], target)
+            with open(target, 'r') as f:
+                after = ConfigIndex.scan(f)
+            self.parse_cache.store(target, target.stat(), after)
+        except Exception as e:
+            print(f"Error restoring {target}: {e}")
+            return False
+        if target == self.env_file:
+            self.compile_env_file()
+        if target in (self.primary_config, self.env_file):
+            self._bump_generation({name: after.get(name)
+                                   for name in {**before.exports, **after.exports}
+                                   if before.get(name) != after.get(name)})
+        print(f"✓ Restored {target} from backup {snap['hash'][:12]} ({snap['time']})")
+        return True
+
+    def prune_backups(self, keep: Optional[int], max_age_days: Optional[float]) -> None:
+        """Drop old snapshots and unreferenced objects"""
+        # Under the config lock, so a concurrent commit's snapshot is never lost
+        with self.commit_queue.locked():
+            dropped = self.backup_store.prune(keep, max_age_days)
+        print(f"✓ Pruned {dropped} backup(s)")
+
+    def set_env_var(self, name: str, value: str, permanent: bool = True) -> bool:
+        """Set an environment variable"""
+        if not name:
+            print("Error: Variable name cannot be empty")
+            return False
+        if not compiled(NAME_PATTERN).fullmatch(name):
+            print(f"Error: Invalid variable name: {name}")
+            return False
+
+        if not permanent:
+            # For temporary variables, we can only provide the export command
+            quoted_value = f'"{value}"' if ' ' in value or '"' in value else value
+            print(f"To set {name} in your current session, run:")
+            print(f"  export {name}={quoted_value}")
+            print("\nOr use this command with eval:")
+            print(f"  eval $(configkeys export {name} '{value}')")
+            return True
+
+        # Make it permanent by adding to the managed env file
+        unchanged = self._unchanged_file({name: value})
+        if unchanged is None:
+            result = self._commit({'set': {name: value}})
+            if result.get('error'):
+                print(f"Error writing to {self.env_file}: {result['error']}")
+                return False
+            if result['unchanged']:
+                unchanged = result['unchanged']
+        if unchanged is not None:
+            print(f"✓ No change: {name} is already set to this value")
+            return True
+
+        files = result['files']
+        print(f"✓ Added {name} to {', '.join(files)}")
+        self._warn_overrides([name])
+        print(f"✓ Variable will be available in new shell sessions")
+        self._print_reload_hint(files)
+        
+        return True
+
+    def set_env_vars(self, mapping: Dict[str, str]) -> bool:
+        """Set many environment variables with one backup and one write"""
+        if not mapping:
+            print("Error: No variables given")
+            return False
+
+        name_re = compiled(NAME_PATTERN)
+        invalid = [name for name in mapping if not name_re.fullmatch(name)]
+        if invalid:
+            print(f"Error: Invalid variable name(s): {', '.join(invalid)}")
+            return False
+
+        if self._unchanged_file(mapping) is not None:
+            print(f"✓ No change: all {len(mapping)} variable(s) already have these values")
+            return True
+
+        result = self._commit({'set': dict(mapping)})
+        if result.get('error'):
+            print(f"Error writing to {self.env_file}: {result['error']}")
+            return False
+        changed = result['set']
+        if not changed:
+            print(f"✓ No change: all {len(mapping)} variable(s) already have these values")
+            return True
+
+        files = result['files']
+        print(f"✓ Set {len(changed)} variable(s) in {', '.join(files)}: "
+              f"{', '.join(changed)}")
+        if result['unchanged']:
+            print(f"✓ {len(result['unchanged'])} variable(s) already had these values")
+        self._warn_overrides(changed)
+        print(f"✓ Variables will be available in new shell sessions")
+        self._print_reload_hint(files)
+
+        return True
+
+    def _unchanged_file(self, mapping: Dict[str, str]) -> Optional[List[str]]:
+        """Return the names if every one already has its value, else None
+
+        Checked against the cached indexes before queueing, so re-applying
+        the same values costs no lock, spool file, backup or write. The
+        commit repeats the check under the lock for concurrent writers.
+        """
+        primary = self.load_config_index()
+        env = self.load_config_index(self.env_file)
+        for name, value in mapping.items():
+            index = primary if primary is not None and name in primary else env
+            if index is None or index.get(name) != value:
+                return None
+        return list(mapping)
+
+    def remove_env_var(self, name: str) -> bool:
+        """Remove an environment variable from shell config"""
+        config_file = self.primary_config
+        if not config_file.exists() and not self.env_file.exists():
+            print(f"No configuration file found at {config_file}")
+            return False
+
+        if not any(self._exports_name(path, name) for path in (config_file, self.env_file)):
+            print(f"Variable '{name}' not found in {config_file} or {self.env_file}")
+            entries = self.reachable_definitions().get(name, [])
+            # A file sourced twice repeats its definitions
+            for path, lineno in dict.fromkeys((path, lineno) for path, lineno, _ in entries):
+                print(f"  It is exported at {path}:{lineno + 1}; edit that file to remove it")
+            return False
+
+        result = self._commit({'remove': [name]})
+        if result.get('error'):
+            print(f"Error writing to {config_file}: {result['error']}")
+            return False
+        if name not in result['removed']:
+            print(f"Variable '{name}' not found in {config_file} or {self.env_file}")
+            return False
+
+        print(f"✓ Removed {name} from {', '.join(result['files'])}")
+        self._warn_overrides([name], removed=True)
+        print("Variable will be removed from new shell sessions")
+        
+        # Remove from current session
+        if name in self.environ:
+            del self.environ[name]
+            print(f"✓ Removed {name} from current session")
+        
+        return True
+
+    def _exports_name(self, config_file: Path, name: str) -> bool:
+        """Whether config_file exports name, from the parse cache or a mapped scan
+
+        A stale cache entry is not rebuilt: a full parse costs far more
+        than one regex pass over the mapped file.
+        """
+        try:
+            st = config_file.stat()
+        except OSError:
+            return False
+        index = self.parse_cache.load(config_file, st)
+        if index is not None:
+            return name in index
+        return bool(find_exports(config_file, name))
+
+    def get_env_var(self, name: str, where: bool = False) -> bool:
+        """Print the configured value of a variable, or every place it is defined
+
+        Reads the primary config and the env file through find_exports,
+        so the lookup never parses either file. The env file is sourced
+        last, so its definition wins.
+        """
+        found = []
+        for config_file in (self.primary_config, self.env_file):
+            found += [(config_file, lineno, value)
+                      for lineno, value in find_exports(config_file, name, with_lines=where)]
+        if not found:
+            print(f"Variable '{name}' not found in {self.primary_config} or {self.env_file}",
+                  file=sys.stderr)
+            return False
+        if where:
+            for config_file, lineno, value in found:
+                print(f"{config_file}:{lineno + 1}: export {name}={value}")
+        else:
+            print(found[-1][2])
+        return True
+
+    def remove_env_vars(self, names: Iterable[str] = (),
+                        matcher: Optional[NameMatcher] = None) -> bool:
+        """Remove every named or pattern-matched variable in a single rewrite"""
+        config_file = self.primary_config
+        if not any(index is not None and index.line_count
+                   for index in (self.load_config_index(),
+                                 self.load_config_index(self.env_file))):
+            print(f"No configuration file found at {config_file}")
+            return False
+
+        request: dict = {'remove': list(dict.fromkeys(names))}
+        if matcher:
+            request['globs'] = matcher.globs
+            request['regexes'] = matcher.regexes
+        result = self._commit(request)
+        if result.get('error'):
+            print(f"Error writing to {config_file}: {result['error']}")
+            return False
+        targets = result['removed']
+        if not targets:
+            print(f"No matching variables found in {config_file} or {self.env_file}")
+            return False
+
+        print(f"✓ Removed {len(targets)} variable(s) from {', '.join(result['files'])}: "
+              f"{', '.join(targets)}")
+        self._warn_overrides(targets, removed=True)
+        print("Variables will be removed from new shell sessions")
+
+        in_session = [name for name in targets if self.environ.pop(name, None) is not None]
+        if in_session:
+            print(f"✓ Removed {', '.join(in_session)} from current session")
+
+        return True
+
+    def show_history(self, count: int = 20) -> None:
+        """Show the most recent journaled transactions, newest first"""
+        transactions = self.journal.transactions()
+        if not transactions:
+            print("No changes recorded")
+            return
+        print(f"\nLast {min(count, len(transactions))} of {len(transactions)} change(s):")
+        print("-" * 50)
+        for position, (_, _, entries) in enumerate(reversed(transactions[-count:]), 1):
+            files = ', '.join(dict.fromkeys(entry['file'] for entry in entries))
+            print(f"{position:>3}  {entries[0]['time']}  {files}")
+            for entry in entries:
+                if entry['op'] == 'set':
+                    before = 'new' if entry['old'] is None else entry['old']
+                    print(f"       set {entry['name']}: {before} -> {entry['new']}")
+                else:
+                    print(f"       remove {entry['name']} (was {entry['old']})")
+
+    def undo(self, count: int = 1) -> bool:
+        """Reverse the last count transactions with one rewrite per file"""
+        with self.commit_queue.locked():
+            return self._undo(count)
+
+    def _undo(self, count: int) -> bool:
+        transactions = self.journal.transactions()
+        if not transactions:
+            print("Nothing to undo")
+            return False
+        undone = transactions[-count:]
+
+        # Walk entries newest first so the oldest value of each name wins
+        per_file: Dict[str, Tuple[Dict[str, Optional[str]], Dict[str, int]]] = {}
+        for _, _, entries in reversed(undone):
+            for entry in reversed(entries):
+                updates, positions = per_file.setdefault(entry['file'], ({}, {}))
+                updates[entry['name']] = entry['old']
+                if entry['op'] == 'remove' and entry['line'] is not None:
+                    positions[entry['name']] = entry['line']
+                else:
+                    positions.pop(entry['name'], None)
+
+        for file_name, (updates, positions) in per_file.items():
+            from pathlib import Path
+
+            config_file = Path(file_name)
+            if not self.backup_config_file(config_file):
+                print("Warning: Could not create backup, proceeding anyway...")
+            try:
+                with open(config_file, 'r') as f:
+                    current = ConfigIndex.scan(f)
+            except FileNotFoundError:
+                current = ConfigIndex({}, False, 0)
+            positions = {name: line for name, line in positions.items() if name not in current}
+            try:
+                index = rewrite_config(config_file, updates, positions)
+                self.parse_cache.store(config_file, config_file.stat(), index)
+            except Exception as e:
+                print(f"Error writing to {config_file}: {e}")
+                return False
+            if config_file == self.env_file:
+                self.compile_env_file()
+            changes = [f"{name}={value}" if value is not None else f"-{name}"
+                       for name, value in updates.items()]
+            print(f"✓ Reverted {config_file}: {', '.join(changes)}")
+
+        self.journal.truncate(undone[0][0])
+        self._bump_generation({name: value for updates, _ in per_file.values()
+                               for name, value in updates.items()})
+        print(f"✓ Undid {len(undone)} change(s)")
+        self._print_reload_hint(per_file)
+        return True
+
+    def show_status(self) -> bool:
+        """Compare this session's managed variables with the env file
+
+        Returns True when the session is up to date.
+        """
+        index = self.load_config_index(self.env_file)
+        literal = compiled(LITERAL_VALUE_PATTERN)
+        current = self.generations.current()
+        session = self.environ.get('_CONFIGKEYS_GEN')
+        if session is None:
+            print(f"Generation: {current} (session not tracked; see 'configkeys hook')")
+        else:
+            print(f"Generation: {current} (session: {session})")
+
+        missing, changed = [], []
+        for name in (index.exports if index is not None else ()):
+            value = index.get(name)
+            if name not in self.environ:
+                missing.append(name)
+            elif literal.match(value) and self.environ[name] != value:
+                changed.append(name)
+        previous, _ = self.generations.load_state()
+        removed = [name for name, kind in previous if kind == '-' and name in self.environ
+                   and (index is None or name not in index)]
+
+        stale = bool(missing or changed or removed) or (session is not None
+                                                        and session != str(current))
+        if not stale:
+            print("✓ Session is up to date")
+            return True
+        print("\nSession is out of date:")
+        for name in missing:
+            print(f"  + {name} (not set in this session)")
+        for name in changed:
+            print(f"  ~ {name} (session has a different value)")
+        for name in removed:
+            print(f"  - {name} (removed, still set in this session)")
+        self._print_reload_hint([str(self.env_file)])
+        return False
+
+    def hook_script(self, shell: str) -> str:
+        """Shell code that reloads changed variables before each prompt
+
+        The per-prompt cost is one builtin read of the generation counter;
+        only when it moved does the hook run configkeys to eval the delta.
+        """
+        counter = self.generations.counter_path
+        script = f"""# configkeys hook: reload changed variables before each prompt
+{{ read -r _CONFIGKEYS_GEN < "{counter}"; }} 2>/dev/null || _CONFIGKEYS_GEN=0
+export _CONFIGKEYS_GEN
+_configkeys_reload() {{
+  local gen=0
+  {{ read -r gen < "{counter}"; }} 2>/dev/null
+  if [[ "$gen" != "$_CONFIGKEYS_GEN" ]]; then
+    eval "$(configkeys delta --since "${{_CONFIGKEYS_GEN:-0}}")"
+  fi
+}}
+"""
+        if shell == 'zsh':
+            script += """typeset -ag precmd_functions
+if (( ! ${precmd_functions[(I)_configkeys_reload]} )); then
+  precmd_functions+=(_configkeys_reload)
+fi
+"""
+        else:
+            script += """if [[ ";${PROMPT_COMMAND:-};" != *";_configkeys_reload;"* ]]; then
+  PROMPT_COMMAND="_configkeys_reload${PROMPT_COMMAND:+;$PROMPT_COMMAND}"
+fi
+"""
+        return script
+
+    def print_delta(self, since: int) -> None:
+        """Print the export/unset lines that bring a session at generation since up to date
+
+        Sessions too far behind for the change log get every managed
+        variable re-exported instead.
+        """
+        generation, changes = self.generations.since(since)
+        lines = []
+        if changes is None:
+            index = self.load_config_index(self.env_file)
+            if index is not None:
+                lines = [f"export {name}={index.get(name)}" for name in index.exports]
+        else:
+            lines = [f"unset {name}" if value is None else f"export {name}={value}"
+                     for name, value in changes.items()]
+        lines.append(f"export _CONFIGKEYS_GEN={generation}")
+        print("\n".join(lines))
+
+    def export_command(self, name: str, value: str) -> None:
+        """Output an export command that can be eval'd"""
+        # Properly quote the value to handle spaces and special characters
+        quoted_value = f'"{value}"' if ' ' in value or '"' in value else value
+        print(f"export {name}={quoted_value}")
+
+    def show_config_location(self) -> None:
+        """Show where the configuration file is located"""
+        print(f"Primary configuration file: {self.primary_config}")
+        print(f"Exists: {'Yes' if self.primary_config.exists() else 'No'}")
+        
+        if self.primary_config.exists():
+            try:
+                stat = self.primary_config.stat()
+                print(f"Size: {stat.st_size} bytes")
+                print(f"Last modified: {stat.st_mtime}")
+            except Exception:
+                pass
+
+            index = self.load_config_index()
+            if index is not None:
+                print(f"Exported variables: {len(index.exports)}")
+                print(f"Sources env file: {'Yes' if self.sources_env_file(index) else 'No'}")
+
+        env_index = self.load_config_index(self.env_file)
+        print(f"\nManaged env file: {self.env_file}")
+        print(f"Managed variables: {len(env_index.exports) if env_index is not None else 0}")
+        wordcode = self.env_file.with_name(f"{self.env_file.name}.zwc")
+        print(f"Compiled wordcode: {'Yes' if wordcode.exists() else 'No'}")
+
+
+def read_assignments(pairs: List[str], files: List[str]) -> Optional[Dict[str, str]]:
+    """Collect NAME=VALUE assignments from argv, files and stdin
+
+    Later assignments win. Stdin is read for a '-' argument, or when no
+    pairs or files were given and stdin is not a terminal.
+    """
+    sources: List[Tuple[str, Iterable[str]]] = []
+    for path in files:
+        try:
+            with open(path, 'r') as f:
+                sources.append((path, f.readlines()))
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            return None
+    if '-' in pairs or (not pairs and not files and not sys.stdin.isatty()):
+        sources.append(('<stdin>', sys.stdin.readlines()))
+    sources.append(('<args>', [pair for pair in pairs if pair != '-']))
+
+    mapping: Dict[str, str] = {}
+    for source, lines in sources:
+        for text in lines:
+            try:
+                assignment = parse_assignment(text)
+            except ValueError as e:
+                print(f"Error in {source}: {e}")
+                return None
+            if assignment:
+                mapping[assignment[0]] = assignment[1]
+    return mapping
+
+
+# Commands the thin client never forwards: daemon control, and export,
+# which is cheaper to run than to forward
+LOCAL_COMMANDS = {'daemon', 'export', '-h', '--help'}
+# Commands whose result depends on the caller's environment
+ENV_COMMANDS = {'list', 'set', 'set-many', 'remove', 'undo', 'status'}
+
+
+def daemon_socket_path() -> str:
+    """Unix socket of the resident daemon ($CONFIGKEYS_SOCKET overrides)"""
+    return (os.environ.get('CONFIGKEYS_SOCKET')
+            or os.path.join(_cache_dir_path(), 'daemon.sock'))
+
+
+def use_daemon(argv: List[str]) -> bool:
+    """Whether this invocation should be forwarded to a running daemon"""
+    if not argv or argv[0] in LOCAL_COMMANDS or os.environ.get('CONFIGKEYS_NO_DAEMON'):
+        return False
+    if argv[0] == 'set-many' and ('-' in argv or not sys.stdin.isatty()):
+        return False  # Needs our stdin
+    return os.path.exists(daemon_socket_path())
+
+
+def daemon_roundtrip(socket_path: str, payload: dict) -> Optional[dict]:
+    """Send one marshal-encoded request to the daemon and return its reply
+
+    Returns None when nothing accepts the connection. This is the whole
+    thin client, so it sticks to builtins: the C-level _socket instead of
+    the socket module (which imports enum and selectors), and marshal
+    instead of json (which imports re). The socket is private to the
+    user, so marshal's lack of hardening against hostile input is moot.
+    """
+    import _socket
+    import marshal
+
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return None
+        sock.sendall(marshal.dumps(payload))
+        sock.shutdown(_socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return marshal.loads(b''.join(chunks))
+    finally:
+        sock.close()
+
+
+def run_via_daemon(argv: List[str]) -> Optional[int]:
+    """Run argv in the daemon and relay its output
+
+    Returns the exit code, or None when no daemon accepted the connection
+    so the caller should run the command itself.
+    """
+    request = {'argv': argv, 'cwd': os.getcwd()}
+    if argv[0] in ENV_COMMANDS:
+        request['env'] = dict(os.environ)
+    try:
+        response = daemon_roundtrip(daemon_socket_path(), request)
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        print(f"Error talking to configkeys daemon: {e}", file=sys.stderr)
+        return 1
+    if response is None:
+        return None
+    write_stream([response.get('stdout', '')])
+    sys.stderr.write(response.get('stderr', ''))
+    return response.get('exit', 0)
+
+
+class ConfigDaemon:
+    """Resident server that runs configkeys commands over a Unix socket
+
+    Keeps one MacEnvManager (and so the parsed config index) in memory;
+    the index is revalidated with a stat per request. Requests are served
+    one at a time, which also keeps writes from the daemon serialized.
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+
+    def _request(self, payload: dict) -> Optional[dict]:
+        try:
+            return daemon_roundtrip(self.socket_path, payload)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def status(self) -> bool:
+        """Report whether a daemon is answering on the socket"""
+        response = self._request({'op': 'ping'})
+        if response is None:
+            print(f"Daemon not running ({self.socket_path})")
+            return False
+        print(f"Daemon running (pid {response['pid']}) on {self.socket_path}")
+        return True
+
+    def stop(self) -> bool:
+        """Ask a running daemon to exit"""
+        if self._request({'op': 'shutdown'}) is None:
+            print(f"Daemon not running ({self.socket_path})")
+            return False
+        print("✓ Daemon stopped")
+        return True
+
+    def serve(self) -> bool:
+        """Serve requests in the foreground until stopped"""
+        import signal
+        import socket
+
+        if self._request({'op': 'ping'}) is not None:
+            print(f"Error: Daemon already running on {self.socket_path}")
+            return False
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        server.listen(64)
+        stop = {'requested': False, 'busy': False}
+
+        def on_sigterm(*_) -> None:
+            # Mid-request, finish it and stop after; run_command's SystemExit
+            # handling must not be what swallows the signal
+            stop['requested'] = True
+            if not stop['busy']:
+                raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, on_sigterm)
+
+        manager = MacEnvManager()
+        parser = build_parser()
+        print(f"✓ Daemon serving on {self.socket_path} (pid {os.getpid()})")
+        sys.stdout.flush()
+        try:
+            while not stop['requested']:
+                conn, _ = server.accept()
+                stop['busy'] = True
+                with conn:
+                    serving = self._handle(conn, manager, parser)
+                stop['busy'] = False
+                if not serving:
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        return True
+
+    def _handle(self, conn, manager: 'MacEnvManager',
+                parser: argparse.ArgumentParser) -> bool:
+        """Serve one connection; returns False when asked to shut down"""
+        import io
+        import marshal
+        import traceback
+        from contextlib import redirect_stderr, redirect_stdout
+
+        try:
+            chunks = []
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            request = marshal.loads(b''.join(chunks))
+        except (OSError, EOFError, ValueError, TypeError):
+            return True
+        if not isinstance(request, dict):
+            return True
+
+        op = request.get('op')
+        if op in ('ping', 'shutdown'):
+            response = {'pid': os.getpid()}
+        else:
+            out, err = io.StringIO(), io.StringIO()
+            code = 0
+            manager.environ = request.get('env', os.environ)
+            try:
+                os.chdir(request.get('cwd', '/'))
+                with redirect_stdout(out), redirect_stderr(err):
+                    run_command(request.get('argv', []), manager, parser)
+            except SystemExit as e:
+                if isinstance(e.code, int):
+                    code = e.code
+                elif e.code is not None:
+                    err.write(f"{e.code}\n")
+                    code = 1
+            except Exception:
+                err.write(traceback.format_exc())
+                code = 1
+            finally:
+                manager.environ = os.environ
+            response = {'stdout': out.getvalue(), 'stderr': err.getvalue(), 'exit': code}
+
+        try:
+            conn.sendall(marshal.dumps(response))
+        except OSError:
+            pass
+        return op != 'shutdown'
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='configkeys',
+        description="ConfigureMacKeys - Simple environment variable management for macOS",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  configkeys list                    # List all environment variables
+  configkeys list PATH              # List variables containing 'PATH'
+  configkeys list --glob 'AWS_*' --exclude '*_SECRET*'  # Combine filters
+  configkeys list --source config   # Variables in shell config files, with file:line
+  configkeys set GEMINI_API_KEY mykey123  # Set a new variable (permanent)
+  configkeys set DEBUG true --temp  # Set temporary variable (with instructions)
+  configkeys set-many A=1 B=2       # Set several variables in one write
+  configkeys set-many -f vars.env   # Set variables listed in a file
+  eval $(configkeys export DEBUG true)    # Set temporary variable immediately
+  configkeys get GEMINI_API_KEY     # Print a variable's configured value
+  configkeys remove OLD_VAR         # Remove a variable
+  configkeys remove --glob 'OLD_*'  # Remove every variable matching a pattern
+  configkeys info                   # Show config file location
+  configkeys history                # Show recent changes
+  configkeys undo 3                 # Reverse the last three changes
+  configkeys backups                # List stored backups
+  configkeys daemon &               # Serve later calls from a resident process
+  eval "$(configkeys hook zsh)"     # Reload changed variables at each prompt
+  configkeys status                 # Show what this session is missing
+        """
+    )
+    
+    parser.add_argument('--startup-report', action='store_true',
+                        help='Measure cold-start time of a command: '
+                             'configkeys --startup-report [--budget MS] [COMMAND ...]')
+    
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+    
+    # List command
+    list_parser = subparsers.add_parser('list', help='List environment variables')
+    list_parser.add_argument('filter', nargs='*',
+                             help='Show names containing any of these substrings (case-insensitive)')
+    list_parser.add_argument('--glob', dest='globs', action='append', default=[],
+                             metavar='PATTERN', help='Show names matching a glob (repeatable)')
+    list_parser.add_argument('--regex', dest='regexes', action='append', default=[],
+                             metavar='PATTERN',
+                             help='Show names matching a regular expression (repeatable)')
+    list_parser.add_argument('--value-contains', dest='value_contains', action='append',
+                             default=[], metavar='TEXT',
+                             help='Only show variables whose value contains TEXT (repeatable)')
+    list_parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                             help='Hide names matching a glob (repeatable)')
+    list_parser.add_argument('--limit', type=int, metavar='N',
+                             help='Show only the first N variables in sorted order')
+    list_parser.add_argument('--source', choices=['env', 'config'], default='env',
+                             help='List the current environment (default) or the variables '
+                                  'exported by the shell config files, with file:line')
+    list_parser.add_argument('--format', dest='fmt', choices=LIST_FORMATS, default='text',
+                             help='Output format: text (default, long values truncated), '
+                                  'json, jsonl, nul (NUL-terminated NAME=VALUE) or env '
+                                  '(shell-quoted exports)')
+    
+    # Set command  
+    set_parser = subparsers.add_parser('set', help='Set an environment variable')
+    set_parser.add_argument('name', help='Variable name')
+    set_parser.add_argument('value', help='Variable value')
+    set_parser.add_argument('--temp', action='store_true', 
+                           help='Set only for current session (not permanent)')
+    
+    # Set-many command
+    set_many_parser = subparsers.add_parser(
+        'set-many', help='Set many environment variables in one write')
+    set_many_parser.add_argument('pairs', nargs='*', metavar='NAME=VALUE',
+                                 help="Assignments to apply ('-' reads them from stdin)")
+    set_many_parser.add_argument('--file', '-f', dest='files', action='append', default=[],
+                                 help='Read NAME=VALUE lines from a file (repeatable)')
+    
+    # Get command
+    get_parser = subparsers.add_parser('get', help='Print the configured value of a variable')
+    get_parser.add_argument('name', help='Variable name')
+    get_parser.add_argument('--where', action='store_true',
+                            help='Show every file:line that exports the variable')
+    
+    # Remove command
+    remove_parser = subparsers.add_parser('remove', help='Remove an environment variable')
+    remove_parser.set_defaults(command_parser=remove_parser)
+    remove_parser.add_argument('name', nargs='?', help='Variable name to remove')
+    remove_parser.add_argument('--glob', dest='globs', action='append', default=[],
+                               metavar='PATTERN',
+                               help="Remove every variable matching a glob, e.g. 'OLD_*' (repeatable)")
+    remove_parser.add_argument('--regex', dest='regexes', action='append', default=[],
+                               metavar='PATTERN',
+                               help='Remove every variable matching a regular expression (repeatable)')
+    
+    # Undo / history commands
+    undo_parser = subparsers.add_parser('undo', help='Reverse the most recent changes')
+    undo_parser.set_defaults(command_parser=undo_parser)
+    undo_parser.add_argument('count', nargs='?', type=int, default=1,
+                             help='Number of changes (commands) to undo (default: 1)')
+    history_parser = subparsers.add_parser('history', help='Show recorded changes')
+    history_parser.add_argument('count', nargs='?', type=int, default=20,
+                                help='Number of changes to show (default: 20)')
+    
+    # Backups command
+    backups_parser = subparsers.add_parser('backups', help='List, restore or prune backups')
+    backups_sub = backups_parser.add_subparsers(dest='backups_command')
+    backups_sub.add_parser('list', help='List stored backups, newest first')
+    restore_parser = backups_sub.add_parser('restore', help='Restore a backup')
+    restore_parser.add_argument('ref', help='Backup number from "backups list" or hash prefix')
+    prune_parser = backups_sub.add_parser('prune', help='Apply backup retention')
+    prune_parser.add_argument('--keep', type=int,
+                              help=f'Number of backups to keep (default: $CONFIGKEYS_BACKUP_KEEP '
+                                   f'or {DEFAULT_BACKUP_KEEP})')
+    prune_parser.add_argument('--max-age', type=float, metavar='DAYS',
+                              help='Also drop backups older than this many days')
+    
+    # Export command (for eval usage)
+    export_parser = subparsers.add_parser('export', help='Output export command for eval')
+    export_parser.add_argument('name', help='Variable name')
+    export_parser.add_argument('value', help='Variable value')
+    
+    # Info command
+    info_parser = subparsers.add_parser('info', help='Show configuration file information')
+    
+    # Status command
+    status_parser = subparsers.add_parser(
+        'status', help='Show whether this session has the current managed variables')
+    status_parser.add_argument('--prompt', action='store_true',
+                               help='Print only a short marker when stale (fast enough for a prompt)')
+    
+    # Hook / delta commands
+    hook_parser = subparsers.add_parser(
+        'hook', help='Print a prompt hook that reloads changed variables (eval it in your rc)')
+    hook_parser.add_argument('shell', choices=['zsh', 'bash'], help='Shell to generate the hook for')
+    delta_parser = subparsers.add_parser(
+        'delta', help='Print export/unset lines for changes since a generation')
+    delta_parser.add_argument('--since', type=int, required=True, metavar='GEN',
+                              help='Generation the session last loaded ($_CONFIGKEYS_GEN)')
+    
+    # Daemon command
+    daemon_parser = subparsers.add_parser(
+        'daemon', help='Run a resident server that keeps parsed config in memory')
+    daemon_parser.add_argument('action', nargs='?', choices=['start', 'stop', 'status'],
+                               default='start',
+                               help='start (foreground, default), stop or status')
+    
+    return parser
+
+
+def run_command(argv: List[str], manager: Optional['MacEnvManager'] = None,
+                parser: Optional[argparse.ArgumentParser] = None) -> None:
+    """Parse argv and dispatch it to a MacEnvManager"""
+    parser = parser or build_parser()
+    args = parser.parse_args(argv)
+    
+    if not args.command:
+        parser.print_help()
+        return
+    
+    manager = manager or MacEnvManager()
+    
+    if args.command == 'list':
+        if args.limit is not None and args.limit < 0:
+            parser.error('--limit must not be negative')
+        try:
+            list_filter = ListFilter(args.filter, args.globs, args.regexes,
+                                     args.value_contains, args.exclude)
+        except ValueError as e:
+            print(f"Error: Invalid pattern {e}")
+            sys.exit(1)
+        if args.source == 'config':
+            manager.list_config_vars(args.limit, args.fmt, list_filter)
+        else:
+            manager.list_env_vars(limit=args.limit, fmt=args.fmt, list_filter=list_filter)
+    elif args.command == 'set':
+        manager.set_env_var(args.name, args.value, permanent=not args.temp)
+    elif args.command == 'set-many':
+        mapping = read_assignments(args.pairs, args.files)
+        if mapping is None:
+            sys.exit(1)
+        if not manager.set_env_vars(mapping):
+            sys.exit(1)
+    elif args.command == 'get':
+        if not manager.get_env_var(args.name, args.where):
+            sys.exit(1)
+    elif args.command == 'remove':
+        if args.globs or args.regexes:
+            try:
+                matcher = NameMatcher(args.globs, args.regexes)
+            except ValueError as e:
+                print(f"Error: Invalid pattern {e}")
+                sys.exit(1)
+            names = [args.name] if args.name else []
+            manager.remove_env_vars(names, matcher)
+        elif args.name:
+            manager.remove_env_var(args.name)
+        else:
+            args.command_parser.error('a variable name, --glob or --regex is required')
+    elif args.command == 'undo':
+        if args.count < 1:
+            args.command_parser.error('count must be at least 1')
+        if not manager.undo(args.count):
+            sys.exit(1)
+    elif args.command == 'history':
+        manager.show_history(args.count)
+    elif args.command == 'backups':
+        if args.backups_command == 'restore':
+            if not manager.restore_backup(args.ref):
+                sys.exit(1)
+        elif args.backups_command == 'prune':
+            manager.prune_backups(args.keep, args.max_age)
+        else:
+            manager.list_backups()
+    elif args.command == 'export':
+        manager.export_command(args.name, args.value)
+    elif args.command == 'info':
+        manager.show_config_location()
+    elif args.command == 'status':
+        if args.prompt:
+            sys.stdout.write(prompt_status(manager.environ))
+        elif not manager.show_status():
+            sys.exit(1)
+    elif args.command == 'hook':
+        print(manager.hook_script(args.shell), end='')
+    elif args.command == 'delta':
+        manager.print_delta(args.since)
+    elif args.command == 'daemon':
+        daemon = ConfigDaemon(daemon_socket_path())
+        if args.action == 'stop':
+            ok = daemon.stop()
+        elif args.action == 'status':
+            ok = daemon.status()
+        else:
+            ok = daemon.serve()
+        if not ok:
+            sys.exit(1)
+
+
+def run_fast_path(argv: List[str]) -> bool:
+    """Serve status --prompt and the option-free forms of export, get and list without argparse
+
+    These run inside `eval $(...)` during shell startup, where importing
+    argparse (and the re/enum/functools chain behind it) is most of the
+    runtime. Anything with options falls through to the full parser.
+    """
+    if argv == ['status', '--prompt']:
+        sys.stdout.write(prompt_status(os.environ))
+        return True
+    if any(arg.startswith('-') for arg in argv[1:]):
+        return False
+    if argv[:1] == ['export'] and len(argv) == 3:
+        MacEnvManager().export_command(argv[1], argv[2])
+        return True
+    if argv[:1] == ['get'] and len(argv) == 2:
+        if not MacEnvManager().get_env_var(argv[1]):
+            sys.exit(1)
+        return True
+    if argv[:1] == ['list'] and len(argv) <= 2:
+        MacEnvManager().list_env_vars(argv[1] if len(argv) == 2 else None)
+        return True
+    return False
+
+
+def _parse_importtime(stderr: str) -> Dict[str, float]:
+    """Map top-level module -> cumulative import time in ms from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # Nested imports are indented
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules
+
+
+def run_startup_report(argv: List[str]) -> int:
+    """Compare a command's cold start with a bare interpreter
+
+    The command really runs, so measure read-only commands. Returns a
+    non-zero exit status when the overhead exceeds --budget, which lets
+    CI guard startup time.
+    """
+    import argparse
+    import subprocess
+    import time
+
+    parser = argparse.ArgumentParser(prog='configkeys --startup-report')
+    parser.add_argument('--budget', type=float, metavar='MS',
+                        help='Fail when startup overhead over a bare interpreter exceeds this')
+    parser.add_argument('--runs', type=int, default=10, help='Runs per measurement (best is kept)')
+    parser.add_argument('command', nargs=argparse.REMAINDER,
+                        help='Command to measure (default: export NAME value)')
+    args = parser.parse_args(argv)
+    command = args.command or ['export', 'NAME', 'value']
+
+    env = dict(os.environ, CONFIGKEYS_NO_DAEMON='1')
+    script = os.path.abspath(sys.argv[0])
+
+    def best_of(cmd: List[str]) -> float:
+        best = float('inf')
+        for _ in range(max(args.runs, 1)):
+            start = time.perf_counter()
+            subprocess.run(cmd, env=env, stdin=subprocess.DEVNULL,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    def imports(cmd: List[str]) -> Dict[str, float]:
+        proc = subprocess.run(cmd[:1] + ['-X', 'importtime'] + cmd[1:], env=env,
+                              stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, text=True)
+        return _parse_importtime(proc.stderr)
+
+    bare_cmd = [sys.executable, '-c', 'pass']
+    target_cmd = [sys.executable, script] + command
+    bare_ms = best_of(bare_cmd)
+    target_ms = best_of(target_cmd)
+    overhead = target_ms - bare_ms
+    baseline = imports(bare_cmd)
+    extra = sorted(((ms, name) for name, ms in imports(target_cmd).items()
+                    if name not in baseline), reverse=True)
+
+    print(f"Cold start of: configkeys {' '.join(command)} (best of {args.runs} runs)")
+    print("-" * 50)
+    print(f"Bare interpreter: {bare_ms:8.1f} ms")
+    print(f"configkeys:       {target_ms:8.1f} ms")
+    print(f"Overhead:         {overhead:8.1f} ms")
+    if __file__.endswith('.py'):
+        import importlib.util
+
+        cache = importlib.util.cache_from_source(__file__)
+        if not os.path.exists(cache) or os.path.getmtime(cache) < os.path.getmtime(__file__):
+            # Without fresh, writable bytecode the module is compiled on every launch
+            with open(__file__, 'rb') as f:
+                source = f.read()
+            start = time.perf_counter()
+            compile(source, __file__, 'exec')
+            print(f"  of which compiling {os.path.basename(__file__)} (stale or missing bytecode): "
+                  f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    if extra:
+        print("\nImports beyond the bare interpreter (cumulative):")
+        for ms, name in extra[:15]:
+            print(f"  {ms:7.2f} ms  {name}")
+    if args.budget is not None:
+        if overhead > args.budget:
+            print(f"\n✗ Over budget: {overhead:.1f} ms > {args.budget:.1f} ms")
+            return 1
+        print(f"\n✓ Within budget: {overhead:.1f} ms <= {args.budget:.1f} ms")
+    return 0
+
+
+def main():
+    argv = sys.argv[1:]
+    if argv[:1] == ['--startup-report']:
+        sys.exit(run_startup_report(argv[1:]))
+    try:
+        if run_fast_path(argv):
+            return
+        if use_daemon(argv):
+            code = run_via_daemon(argv)
+            if code is not None:
+                sys.exit(code)
+        run_command(argv)
+    except BrokenPipeError:
+        # The reader (e.g. head) exited; stop quietly like other CLI tools
+        silence_stdout()
+
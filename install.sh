@@ -2,6 +2,9 @@
 
 # ConfigureMacKeys Installation Script
 # This script installs the configkeys command globally
+#
+# Usage: ./install.sh [--prefix DIR]
+#   --prefix DIR  Install into DIR instead of /usr/local/bin
 
 set -e
 
@@ -9,26 +12,50 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 INSTALL_DIR="/usr/local/bin"
 SCRIPT_NAME="configkeys"
 SOURCE_SCRIPT="$SCRIPT_DIR/configkeys.py"
+CORE_MODULE="$SCRIPT_DIR/configkeys_core.py"
+
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --prefix)
+            INSTALL_DIR="$2"
+            shift
+            ;;
+        *)
+            echo "❌ Error: Unknown option $1"
+            echo "Usage: $0 [--prefix DIR]"
+            exit 1
+            ;;
+    esac
+    shift
+done
 
 echo "🔧 Installing ConfigureMacKeys..."
 
 # Check if the source script exists
-if [ ! -f "$SOURCE_SCRIPT" ]; then
-    echo "❌ Error: configkeys.py not found in $SCRIPT_DIR"
+if [ ! -f "$SOURCE_SCRIPT" ] || [ ! -f "$CORE_MODULE" ]; then
+    echo "❌ Error: configkeys.py or configkeys_core.py not found in $SCRIPT_DIR"
     exit 1
 fi
 
-# Check if we have write permission to /usr/local/bin
+# Make sure the script is executable
+chmod +x "$SOURCE_SCRIPT"
+# Cache the core module's bytecode now, in case the checkout is not
+# writable when configkeys first runs
+python3 -m py_compile "$CORE_MODULE" 2>/dev/null || true
+INSTALL_CMD=(ln -sf "$SOURCE_SCRIPT" "$INSTALL_DIR/$SCRIPT_NAME")
+
+mkdir -p "$INSTALL_DIR" 2>/dev/null || true
+
+# Check if we have write permission to the install directory
 if [ ! -w "$INSTALL_DIR" ]; then
     echo "📋 Need sudo permissions to install to $INSTALL_DIR"
-    sudo ln -sf "$SOURCE_SCRIPT" "$INSTALL_DIR/$SCRIPT_NAME"
+    sudo rm -f "$INSTALL_DIR/$SCRIPT_NAME"
+    sudo "${INSTALL_CMD[@]}"
 else
-    ln -sf "$SOURCE_SCRIPT" "$INSTALL_DIR/$SCRIPT_NAME"
+    rm -f "$INSTALL_DIR/$SCRIPT_NAME"
+    "${INSTALL_CMD[@]}"
 fi
 
-# Make sure the script is executable
-chmod +x "$SOURCE_SCRIPT"
-
 echo "✅ ConfigureMacKeys installed successfully!"
 echo ""
 echo "You can now use the 'configkeys' command from anywhere:"
@@ -37,4 +64,4 @@ echo "  configkeys set KEY value     # Set an environment variable"
 echo "  configkeys remove KEY        # Remove an environment variable"
 echo "  configkeys info              # Show config file location"
 echo ""
-echo "Run 'configkeys --help' for more information." 
\ No newline at end of file
+echo "Run 'configkeys --help' for more information."
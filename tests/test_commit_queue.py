@@ -0,0 +1,59 @@
+"""Group commit: concurrent writers share one locked commit"""
+
+import fcntl
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'configkeys.py'
+WRITERS = 6
+
+
+class GroupCommitTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.TemporaryDirectory(prefix='configkeys-test-')
+        self.addCleanup(self.home.cleanup)
+        home = Path(self.home.name)
+        (home / '.zshrc').write_text("export PATH=/usr/bin:/bin\n")
+        self.data = home / '.local' / 'share' / 'configkeys'
+        self.env_file = home / '.config' / 'configkeys' / 'env.zsh'
+        self.env = dict(os.environ, HOME=self.home.name, CONFIGKEYS_NO_DAEMON='1',
+                        CONFIGKEYS_ZCOMPILE='0')
+        for var in ('XDG_CONFIG_HOME', 'XDG_DATA_HOME', 'XDG_CACHE_HOME'):
+            self.env.pop(var, None)
+
+    def spooled(self):
+        return sorted((self.data / 'pending').glob('*'))
+
+    def test_concurrent_sets_are_committed_together(self):
+        self.data.mkdir(parents=True)
+        lock = os.open(self.data / 'lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # Hold the config lock until every writer has queued its request
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            procs = [subprocess.Popen([sys.executable, str(SCRIPT), 'set', f"GROUP_{i}", str(i)],
+                                      env=self.env, stdout=subprocess.DEVNULL)
+                     for i in range(WRITERS)]
+            deadline = time.monotonic() + 30
+            while len(self.spooled()) < WRITERS and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            os.close(lock)
+        for proc in procs:
+            self.assertEqual(proc.wait(timeout=30), 0)
+
+        exports = self.env_file.read_text().splitlines()
+        for i in range(WRITERS):
+            self.assertIn(f"export GROUP_{i}={i}", exports)
+        self.assertEqual(self.spooled(), [])
+        generation = int((self.data / 'generation').read_text())
+        self.assertGreater(generation, 0)
+        self.assertLess(generation, WRITERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
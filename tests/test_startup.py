@@ -0,0 +1,46 @@
+"""Cold-start budget for the commands run from shell startup files"""
+
+import os
+import py_compile
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = ROOT / 'configkeys.py'
+# Overhead over a bare interpreter, in ms; override on slow machines
+BUDGET_MS = os.environ.get('CONFIGKEYS_STARTUP_BUDGET', '25')
+
+
+class StartupBudgetTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Installs cache the module's bytecode; make sure it is fresh here too
+        py_compile.compile(str(ROOT / 'configkeys_core.py'), doraise=True)
+
+    def setUp(self):
+        self.home = tempfile.TemporaryDirectory(prefix='configkeys-test-')
+        self.addCleanup(self.home.cleanup)
+        Path(self.home.name, '.zshrc').write_text("export PATH=/usr/bin:/bin\n")
+        self.env = dict(os.environ, HOME=self.home.name)
+        # Keep every configkeys directory inside the scratch HOME
+        for var in ('XDG_CONFIG_HOME', 'XDG_DATA_HOME', 'XDG_CACHE_HOME'):
+            self.env.pop(var, None)
+
+    def assert_within_budget(self, *command):
+        proc = subprocess.run([sys.executable, str(SCRIPT), '--startup-report',
+                               '--budget', BUDGET_MS, *command],
+                              env=self.env, stdout=subprocess.PIPE, text=True)
+        self.assertEqual(proc.returncode, 0, proc.stdout)
+
+    def test_export(self):
+        self.assert_within_budget('export', 'NAME', 'value')
+
+    def test_list(self):
+        self.assert_within_budget('list', 'PATH')
+
+
+if __name__ == '__main__':
+    unittest.main()
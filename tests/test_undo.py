@@ -0,0 +1,46 @@
+"""Regression tests for undo restoring removed exports in place"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'configkeys.py'
+
+
+class UndoTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.TemporaryDirectory(prefix='configkeys-test-')
+        self.addCleanup(self.home.cleanup)
+        self.zshrc = Path(self.home.name) / '.zshrc'
+        self.env = dict(os.environ, HOME=self.home.name, CONFIGKEYS_NO_DAEMON='1',
+                        CONFIGKEYS_ZCOMPILE='0')
+        # Keep every configkeys directory inside the scratch HOME
+        for var in ('XDG_CONFIG_HOME', 'XDG_DATA_HOME', 'XDG_CACHE_HOME'):
+            self.env.pop(var, None)
+
+    def run_cli(self, *args):
+        subprocess.run([sys.executable, str(SCRIPT), *args], env=self.env,
+                       check=True, stdout=subprocess.DEVNULL)
+
+    def test_multi_name_remove_undo_restores_original_lines(self):
+        original = ("export OLD_A=1\nexport OLD_B=2\nalias x=y\n"
+                    "export OLD_C=3\nexport KEEP=1\n")
+        self.zshrc.write_text(original)
+        self.run_cli('remove', '--glob', 'OLD_*')
+        self.assertEqual(self.zshrc.read_text(), "alias x=y\nexport KEEP=1\n")
+        self.run_cli('undo')
+        self.assertEqual(self.zshrc.read_text(), original)
+
+    def test_undo_of_trailing_removals_adds_no_marker(self):
+        original = "alias x=y\nexport A=1\nexport B=2"
+        self.zshrc.write_text(original)
+        self.run_cli('remove', '--glob', '*')
+        self.run_cli('undo')
+        self.assertEqual(self.zshrc.read_text(), original + "\n")
+
+
+if __name__ == '__main__':
+    unittest.main()